@@ -1,8 +1,13 @@
 from .api import TodoistAPI, AsyncTodoistAPI
+from .cache import CacheBackend, JournalCache, MemoryCache, NullCache, SQLiteCache
+from .transport import Transport, ConnectionPool
 from .subscribe import Handler, json_default, subscribe
+from .scheduler import SyncScheduler
 
 __all__ = ("TodoistAPI", "AsyncTodoistAPI",
-           "subscribe", "Handler", "json_default")
+           "subscribe", "Handler", "json_default", "SyncScheduler",
+           "CacheBackend", "JournalCache", "MemoryCache", "NullCache", "SQLiteCache",
+           "Transport", "ConnectionPool")
 
 __version__ = '8.1.0.2'
 # Versioning uses: major.minorA . majorB.minorB
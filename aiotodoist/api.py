@@ -1,7 +1,9 @@
-from asyncio import iscoroutine, isfuture, ensure_future
+from types import MappingProxyType
+from functools import partial
+from asyncio import iscoroutine, isfuture, ensure_future, get_running_loop, sleep, Lock
 
-from aiohttp import ClientSession
-from todoist.api import TodoistAPI, json_dumps, SyncError
+from todoist.api import TodoistAPI, json_default, SyncError
+from todoist.models import Model
 
 from .managers import (AsyncUserManager,
                        AsyncFiltersManager,
@@ -15,6 +17,18 @@ from .managers import (AsyncUserManager,
                        AsyncItemsArchiveManagerMaker,
                        AsyncSectionsArchiveManagerMaker,
                        )
+from .cache import CacheBackend, JournalCache
+from .codec import get_codec
+from .compact import compact_model_cls
+from .events import ChangeEvent, ChangeStream, CREATED, UPDATED, DELETED, field_changes
+from .flush import AutoFlush
+from .query import select
+from .snapshot import PMap, StateSnapshot, freeze
+from .responses import ResponseCache
+from .state import (StateList, model_cls, object_key, is_deleted, watch_data,
+                    REFERENCE_FIELDS, TEMP_ID_TYPES)
+from .stream import iter_sync_response
+from .transport import Transport, ConnectionPool
 
 
 class AsyncTodoistAPI(TodoistAPI):
@@ -24,9 +38,40 @@ class AsyncTodoistAPI(TodoistAPI):
     API_ENDPOINT = "https://api.todoist.com"
     API_VERSION = "v8"
 
-    def __init__(self, token="", session=None, cache="~/.todoist-sync/"):
-        session = session or ClientSession()
-        super().__init__(token, session=session, cache=cache)
+    #: the objects merged at once by `merge="chunked"`.
+    merge_chunk_size = 500
+
+    def __init__(self, token="", session=None, cache="~/.todoist-sync/",
+                 transport=None, pool=None, codec=None, merge=None, merge_executor=None,
+                 compact=False):
+        #: the session and pool we created are the ones we have to close.
+        self._owned = []
+        #: the model classes of the objects merged into the state.
+        self.model_classes = compact_model_cls if compact else {}
+        #: the streams returned by `changes()`.
+        self.change_streams = []
+        if session is None:
+            if pool is None:
+                pool = ConnectionPool()
+                self._owned.append(pool)
+            session = pool.session()
+            self._owned.insert(0, session)
+        super().__init__(token, session=session, cache=None)
+        #: encodes the commands, decodes the responses and the cache files.
+        self.codec = get_codec(codec)
+        self.transport = transport or Transport()
+        self.responses = ResponseCache()
+        self.flusher = None
+        #: the resource types synced by default, e.g. by `commit()`.
+        self.resource_types = ["all"]
+        #: callables called with every sync response before it is merged.
+        self.response_hooks = []
+        if merge not in (None, "thread", "chunked"):
+            raise ValueError(f"unknown merge {merge!r}")
+        #: how sync responses are merged, see `_merge_async`.
+        self.merge = merge
+        self.merge_executor = merge_executor
+        self._state_lock = None
 
         self.user = AsyncUserManager(self)
         self.filters = AsyncFiltersManager(self)
@@ -40,6 +85,241 @@ class AsyncTodoistAPI(TodoistAPI):
         self.items_archive = AsyncItemsArchiveManagerMaker(self)
         self.sections_archive = AsyncSectionsArchiveManagerMaker(self)
 
+        if isinstance(cache, CacheBackend):
+            self.cache = cache
+        elif cache:  # Read and write user state on local disk cache
+            self.cache = JournalCache(cache, codec=self.codec)
+            self._owned.append(self.cache)
+        self._read_cache()
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self.close()
+
+    async def close(self):
+        """
+        Commits the commands queued for the auto flush and stops it, stops
+        the change streams, waits for the pending cache writes and closes
+        the session, pool and cache created by this api.
+        """
+        if self.flusher is not None:
+            await self.flusher.flush()
+        self.disable_autoflush()
+        for stream in self.change_streams[:]:
+            stream.close()
+        if self.cache:
+            await get_running_loop().run_in_executor(None, self.cache.flush)
+        for res in self._owned:
+            if isinstance(res, CacheBackend):
+                await get_running_loop().run_in_executor(None, res.close)
+            else:
+                await res.close()
+        self._owned.clear()
+
+    def _read_cache(self):
+        if not self.cache:
+            return
+
+        try:
+            for delta in self.cache.load(self.token):
+                self._update_state(delta)
+        except Exception:
+            return
+
+    def _write_cache(self, delta=None):
+        if not self.cache:
+            return
+        if delta is None:
+            # nothing is known about what changed, so journal the whole state.
+            delta = dict(self.state, sync_token=self.sync_token)
+            delta.update((dtype, [obj.data for obj in delta[dtype]])
+                         for dtype in model_cls)
+        self.cache.write(self.token, delta)
+
+    def reset_state(self):
+        super().reset_state()
+        #: the `PMap`s of `snapshot()`, kept up to date once it was called.
+        self._snapshots = None
+        #: the frozen copies of the other state values, until they change.
+        self._frozen_state = None
+        for dtype in model_cls:
+            self.state[dtype] = self._state_list(dtype)
+        #: the sync tokens of the syncs of other resource types than
+        #: `resource_types`, by their tuple, see `sync`.
+        self.sync_tokens = {}
+
+    def snapshot(self):
+        """
+        Returns a `StateSnapshot` of the state as it is now, which does not
+        change afterwards.  The first call copies the state; from then on,
+        every merged (or locally added) object is copied into the snapshots
+        once, and the rest is shared between them, as are the copies of the
+        other state values until a merge changes them.  With `merge="thread"`
+        or `merge="chunked"`, take it under `api.state_lock`, else it may
+        see a response half merged.
+        """
+        if self._snapshots is None:
+            self._snapshots = {
+                dtype: PMap((object_key(dtype, obj.data), freeze(obj.data))
+                            for obj in self._objects(dtype))
+                for dtype in model_cls}
+        if self._frozen_state is None:
+            self._frozen_state = {}
+        frozen = self._frozen_state
+        for key, value in self.state.items():
+            if key not in model_cls and key not in frozen:
+                frozen[key] = freeze(value)
+        state = dict(frozen)
+        state.update(self._snapshots)
+        return StateSnapshot(self.sync_token, MappingProxyType(state))
+
+    def _snapshot_object(self, dtype, obj, present=True, key=None):
+        """
+        Copies `obj` into the snapshots (or drops it unless `present`),
+        under `key` if given, else under its current key.
+        """
+        if self._snapshots is None:
+            return
+        if key is None:
+            try:
+                key = object_key(dtype, obj.data)
+            except KeyError:
+                return
+        snap = self._snapshots[dtype]
+        self._snapshots[dtype] = snap.set(key, freeze(obj.data)) if present else snap.delete(key)
+
+    def _state_list(self, dtype, objs=()):
+        return StateList(dtype, objs, on_change=partial(self._snapshot_object, dtype))
+
+    def _objects(self, dtype):
+        objs = self.state[dtype]
+        if not isinstance(objs, StateList):
+            # the state was replaced from outside, e.g. by `deserialize`.
+            objs = self.state[dtype] = self._state_list(dtype, objs)
+            for obj in objs:
+                if getattr(obj, "api", None) is None:  # pickled without it.
+                    obj.api = self
+        return objs
+
+    def _find_object(self, objtype, obj):
+        if objtype not in model_cls:
+            return None
+        return self._objects(objtype).index.match(obj)
+
+    def select(self, dtype="items", order_by=None, reverse=False, limit=None,
+               due_from=None, due_before=None, **filters):
+        """
+        Returns the models of `dtype` in the state whose fields equal the
+        keyword arguments, e.g. `api.select(project_id=1, checked=0)`,
+        without any request.
+
+        The indexed fields are answered from the state indexes: see
+        `state.INDEXED_FIELDS` and `state.TYPE_FIELDS`.  An item matches
+        `labels=id` when it has that label, and `due` compares the day of
+        the due date; `due_from` and `due_before` select a range of days
+        (`"YYYY-MM-DD"` or `date`s, `due_before` not included).  The
+        models are sorted by the field `order_by` if any, and at most
+        `limit` are returned.
+        """
+        return select(self._objects(dtype), order_by, reverse, limit,
+                      due_from, due_before, **filters)
+
+    def _update_state(self, syncdata):
+        others = {k: v for k, v in syncdata.items() if k not in model_cls}
+        super()._update_state(others)
+        if self._frozen_state is not None:
+            # only the state values of the response are frozen again.
+            for key in others.keys() & self._frozen_state.keys():
+                del self._frozen_state[key]
+
+        # events are only built when somebody listens.
+        events = [] if self.change_streams else None
+        for dtype in model_cls:
+            if dtype not in syncdata:
+                continue
+
+            objs, removes = self._objects(dtype), []
+            for remote_obj in syncdata[dtype]:
+                model = None
+                if isinstance(remote_obj, Model):  # built off the loop, see `_merge_async`.
+                    model, remote_obj = remote_obj, remote_obj.data
+                key = object_key(dtype, remote_obj)
+                local_obj = objs.index.get(key)
+                if self.responses:
+                    self.responses.invalidate(dtype, remote_obj.get("id"))
+                if local_obj is not None:
+                    if is_deleted(remote_obj):
+                        removes.append(local_obj)
+                        if events is not None:
+                            events.append(ChangeEvent(DELETED, dtype, key,
+                                                      dict(local_obj.data), None))
+                    else:
+                        if events is not None:
+                            before = dict(local_obj.data)
+                            changes = field_changes(before, remote_obj)
+                        local_obj.data.update(remote_obj)
+                        if events is not None:
+                            events.append(ChangeEvent(UPDATED, dtype, key, before,
+                                                      dict(local_obj.data), changes))
+                        self._snapshot_object(dtype, local_obj, key=key)
+                elif not is_deleted(remote_obj):
+                    objs.append(model if model is not None else
+                                self._make_model(dtype, remote_obj))
+                    if events is not None:
+                        events.append(ChangeEvent(CREATED, dtype, key, None,
+                                                  dict(remote_obj)))
+            if removes:
+                objs.discard_many(removes)
+
+        if events:
+            for stream in self.change_streams[:]:
+                stream.put(events)
+
+    def _make_model(self, dtype, data):
+        """Returns the model of a new object of the state."""
+        return self.model_classes.get(dtype, model_cls[dtype])(data, self)
+
+    def changes(self, maxsize=1000, overflow="drop"):
+        """
+        Returns a `ChangeStream` of the changes merged into the state from
+        now on: `async for event in api.changes(): ...`.
+        """
+        stream = ChangeStream(self, maxsize, overflow)
+        self.change_streams.append(stream)
+        return stream
+
+    def _replace_temp_id(self, temp_id, new_id):
+        return bool(self._replace_temp_ids({temp_id: new_id}))
+
+    def _replace_temp_ids(self, mapping):
+        """
+        Gives the real ids of `mapping` to the local objects created with
+        these temporary ids, and to the `REFERENCE_FIELDS` of the objects
+        which refer to them, through the indexes.  Returns the number of
+        objects found.
+        """
+        found = 0
+        for dtype in model_cls:
+            index = self._objects(dtype).index
+            if not index:
+                continue
+            for temp_id, new_id in mapping.items():
+                obj = index.get_temp(temp_id) if dtype in TEMP_ID_TYPES else None
+                if obj is not None and obj["id"] != new_id:
+                    self._snapshot_object(dtype, obj, present=False)
+                    obj["id"] = new_id
+                    self._snapshot_object(dtype, obj)
+                    found += 1
+                for field in REFERENCE_FIELDS:
+                    if field not in index.fields:
+                        continue
+                    for obj in list(index.bucket(field, temp_id).values()):
+                        obj[field] = new_id
+                        self._snapshot_object(dtype, obj)
+        return found
+
     def _get(self, call, url=None, **kwargs):
         url = url or self.get_api_url()
 
@@ -73,10 +353,10 @@ class AsyncTodoistAPI(TodoistAPI):
     async def _get_async(self, call, url=None, **kwargs):
         url = url or self.get_api_url()
 
-        resp = await self.session.get(url + call, **kwargs)
+        resp = await self.transport.request(self.session, "get", url + call, **kwargs)
 
         try:
-            return await resp.json()
+            return await resp.json(loads=self.codec.loads)
         except ValueError:
             return await resp.text()
 
@@ -84,35 +364,47 @@ class AsyncTodoistAPI(TodoistAPI):
         url = url or self.get_api_url()
 
         data = {**(data or {}), **(files or {})}
-        resp = await self.session.post(url + call, data=data, **kwargs)
+        resp = await self.transport.request(self.session, "post", url + call,
+                                            data=data, **kwargs)
 
         try:
-            return await resp.json()
+            return await resp.json(loads=self.codec.loads)
         except ValueError:
             return await resp.text()
 
-    def sync(self, commands=None):
+    def sync(self, commands=None, stream=False, resource_types=None):
+        """
+        Syncs the state, or only the `resource_types` given (by default
+        `api.resource_types`).  The sync token of a subset of the resource
+        types is only good for them, so it is kept in `sync_tokens` rather
+        than as `sync_token`, which the syncs of `api.resource_types` (e.g.
+        by `commit()`) use.
+        """
         def _callback(fut=None, response=None):
             try:
                 response = response or fut.result()
             except Exception:
                 response = dict()
-            if "temp_id_mapping" in response:
-                for temp_id, new_id in response["temp_id_mapping"].items():
-                    self.temp_ids[temp_id] = new_id
-                    self._replace_temp_id(temp_id, new_id)
-            self._update_state(response)
-            self._write_cache()
+            self._merge_response(self._own_token(types, response))
 
+        types = tuple(resource_types or self.resource_types)
+        if types == tuple(self.resource_types):
+            types = None
         post_data = {
             "token": self.token,
-            "sync_token": self.sync_token,
+            # a sync token of all the types is good for any subset too.
+            "sync_token": self.sync_tokens.get(types, self.sync_token),
             "day_orders_timestamp": self.state["day_orders_timestamp"],
             "include_notification_settings": 1,
-            "resource_types": json_dumps(["all"]),
-            "commands": json_dumps(commands or []),
+            "resource_types": self.codec.dumps(list(resource_types or self.resource_types)),
+            "commands": self.codec.dumps(commands or [], default=json_default),
         }
         response = self._post("sync", data=post_data)
+        if iscoroutine(response) and stream:
+            response.close()
+            return ensure_future(self._sync_stream(post_data, types=types))
+        if iscoroutine(response) and self.merge:
+            return ensure_future(self._merge_async(response, types))
         if iscoroutine(response):
             response = ensure_future(response)
             response.add_done_callback(_callback)
@@ -120,7 +412,150 @@ class AsyncTodoistAPI(TodoistAPI):
             _callback(response=response)
         return response
 
-    def commit(self, raise_on_error=True):
+    @property
+    def state_lock(self):
+        """
+        Held while a sync response is merged with `merge="thread"` or
+        `merge="chunked"`: `async with api.state_lock:` to read a state
+        which is not half merged.
+        """
+        if self._state_lock is None:
+            self._state_lock = Lock()
+        return self._state_lock
+
+    def _own_token(self, types, response):
+        """
+        Returns the `response` of a sync of the resource `types` to merge:
+        without its sync token, which goes to `sync_tokens`, unless they
+        are `resource_types` (`None`).
+        """
+        if types is None or not isinstance(response, dict) or "sync_token" not in response:
+            return response
+        response = dict(response)
+        self.sync_tokens[types] = response.pop("sync_token")
+        return response
+
+    def _run_hooks(self, response):
+        if response and isinstance(response, dict):
+            for hook in self.response_hooks[:]:
+                hook(response)
+
+    def _merge_response(self, response):
+        self._run_hooks(response)
+        self._apply_response(response)
+
+    async def _merge_async(self, response, types=None):
+        """
+        Merges `response` without blocking the loop, `merge_chunk_size`
+        objects at a time.  With `merge="thread"`, the models of the
+        response are built in `merge_executor` first.  The response hooks
+        run on the loop, first.
+
+        The state is only ever changed on the loop, so that the reads and
+        the other changes made meanwhile (e.g. by `get()` callbacks,
+        webhooks or `items.add`) never see it changing under them.
+        """
+        response = await response
+        if not isinstance(response, dict):
+            return response
+        merged = self._own_token(types, response)
+        async with self.state_lock:
+            self._run_hooks(merged)
+            built = merged
+            if self.merge == "thread":
+                built = await get_running_loop().run_in_executor(
+                    self.merge_executor, self._build_models, merged)
+
+            self._apply_temp_ids(merged)
+            for dtype in model_cls:
+                objs = built.get(dtype) or ()
+                for i in range(0, len(objs), self.merge_chunk_size):
+                    self._update_state({dtype: objs[i:i + self.merge_chunk_size]})
+                    await sleep(0)
+            # the sync token last, as if everything was merged at once.
+            self._update_state({k: v for k, v in merged.items()
+                                if k not in model_cls and k != "temp_id_mapping"})
+            self._write_cache(merged)
+        return response
+
+    def _build_models(self, response):
+        """
+        Returns the object lists of `response`, with the models of its new
+        or updated objects instead of their data, for `_update_state`.  It
+        does not touch the state, so it may run on another thread.
+        """
+        built = {}
+        for dtype in model_cls:
+            objs = response.get(dtype)
+            if not objs:
+                continue
+            built[dtype] = models = []
+            for obj in objs:
+                if not is_deleted(obj):
+                    obj = self._make_model(dtype, obj)
+                    watch_data(obj, None)
+                models.append(obj)
+        return built
+
+    def _apply_response(self, response):
+        self._apply_temp_ids(response)
+        self._update_state(response)
+        self._write_cache(response)
+
+    def _apply_temp_ids(self, response):
+        if "temp_id_mapping" in response:
+            mapping = response["temp_id_mapping"]
+            for temp_id, new_id in mapping.items():
+                self.temp_ids[temp_id] = new_id
+            self._replace_temp_ids(mapping)
+
+    async def _sync_stream(self, post_data, batch_size=500, types=None):
+        """
+        Syncs without holding the response: its objects are merged into the
+        state (and passed to the response hooks) in batches of `batch_size`
+        as they are parsed, and the sync token last.  Returns the response
+        without the lists of objects.
+        """
+        url = self.get_api_url() + "sync"
+        others, batch, size = {}, {}, 0
+        async with self.transport.stream(self.session, "post", url, data=post_data) as resp:
+            async for key, value in iter_sync_response(resp.content):
+                if key in model_cls:
+                    batch.setdefault(key, []).append(value)
+                    size += 1
+                    if size >= batch_size:
+                        self._merge_response(batch)
+                        batch, size = {}, 0
+                else:
+                    others[key] = value
+                    if key == "temp_id_mapping":
+                        # the objects merged from now on have their real ids.
+                        self._merge_response(dict(batch, temp_id_mapping=value))
+                        batch, size = {}, 0
+        if batch:
+            self._merge_response(batch)
+        self._merge_response(self._own_token(types, {k: v for k, v in others.items()
+                                                     if k != "temp_id_mapping"}))
+        return others
+
+    def enable_autoflush(self, max_commands=100, delay=0.1, **commit_kwargs):
+        """
+        Commits the queue in the background, see `AutoFlush`.  The keyword
+        arguments are passed to `commit`, e.g. `max_bytes`.
+        """
+        if self.flusher is None:
+            self.flusher = AutoFlush(self, max_commands, delay, **commit_kwargs)
+        return self.flusher
+
+    def disable_autoflush(self):
+        if self.flusher is not None:
+            self.flusher.close()
+            self.flusher = None
+
+    def commit(self, raise_on_error=True, max_commands=None, max_bytes=None):
+        if self.queue and (max_commands or max_bytes):
+            return self._commit_chunks(raise_on_error, max_commands, max_bytes)
+
         async def _helper(fut):
             try:
                 ret = await fut
@@ -153,3 +588,91 @@ class AsyncTodoistAPI(TodoistAPI):
                 _callback(ret)
 
             return ret
+
+    def _commit_chunks(self, raise_on_error, max_commands=None, max_bytes=None):
+        """
+        Commits the queue as a series of syncs with at most `max_commands`
+        commands or about `max_bytes` of encoded commands each.  A chunk is
+        sent once the previous one is done, with the temporary ids it
+        mapped replaced, and whatever was not confirmed is requeued when a
+        chunk fails or the commit is cancelled.
+        """
+        async def _helper(fut):
+            rv = _callback(await fut)
+            while chunks:
+                rv = _callback(await _send(), rv)
+            return rv
+
+        def _send():
+            return self.sync(commands=[_replace_ids(cmd, self.temp_ids)
+                                       for cmd in chunks[0]])
+
+        def _callback(ret, rv=None):
+            del pending[:len(chunks.pop(0))]
+            rv = rv or dict(sync_status={}, temp_id_mapping={})
+            rv = dict(ret,
+                      sync_status={**rv["sync_status"], **ret.get("sync_status", {})},
+                      temp_id_mapping={**rv["temp_id_mapping"],
+                                       **ret.get("temp_id_mapping", {})})
+            if raise_on_error:
+                for k, v in ret.get("sync_status", {}).items():
+                    if v != "ok":
+                        raise SyncError(k, v)
+            return rv
+
+        def _requeue():
+            self.queue[:] = [_replace_ids(cmd, self.temp_ids)
+                             for cmd in pending] + self.queue[:]
+
+        def _check_cancel(dest_fut):
+            if dest_fut.cancelled() or dest_fut.exception() is not None:
+                src_fut.cancel()
+                _requeue()
+
+        pending = self.queue[:]
+        chunks = list(_chunked(pending, self.codec, max_commands, max_bytes))
+        self.queue[:] = []
+        try:
+            ret = _send()
+            if isfuture(ret):
+                src_fut = ret
+                ret = ensure_future(_helper(src_fut))
+                ret.add_done_callback(_check_cancel)
+                return ret
+
+            rv = _callback(ret)
+            while chunks:
+                rv = _callback(_send(), rv)
+            return rv
+        except BaseException:
+            _requeue()
+            raise
+
+
+def _chunked(commands, codec, max_commands=None, max_bytes=None):
+    chunk, size = [], 0
+    for cmd in commands:
+        cmd_size = len(codec.dumps(cmd, default=json_default)) + 1 if max_bytes else 0
+        if chunk and (len(chunk) == max_commands
+                      or max_bytes and size + cmd_size > max_bytes):
+            yield chunk
+            chunk, size = [], 0
+        chunk.append(cmd)
+        size += cmd_size
+    if chunk:
+        yield chunk
+
+
+def _replace_ids(cmd, mapping):
+    def _replace(value):
+        if isinstance(value, str):
+            return mapping.get(value, value)
+        if isinstance(value, list):
+            return [_replace(v) for v in value]
+        if isinstance(value, dict):
+            return {k: _replace(v) for k, v in value.items()}
+        return value
+
+    if not mapping or "args" not in cmd:
+        return cmd
+    return dict(cmd, args=_replace(cmd["args"]))
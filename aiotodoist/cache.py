@@ -0,0 +1,318 @@
+import os
+import json
+import sqlite3
+from concurrent.futures import ThreadPoolExecutor
+
+from .codec import get_codec
+from .state import model_cls, object_key, is_deleted
+
+#: keys of a sync response which are merged into `api.state`.
+STATE_KEYS = (
+    "day_orders", "day_orders_timestamp", "live_notifications_last_read_id",
+    "locations", "settings_notifications", "user", "user_settings",
+    *model_cls,
+)
+
+
+def journal_entry(delta):
+    """
+    Picks the part of a sync response that has to be cached.  Objects are
+    shallow-copied so they can be encoded in another thread while the
+    models wrapping the response are changed locally.
+    """
+    entry = {}
+    for key in STATE_KEYS:
+        if key not in delta:
+            continue
+        value = delta[key]
+        if key in model_cls:
+            entry[key] = [dict(obj) for obj in value]
+        else:
+            entry[key] = dict(value) if isinstance(value, dict) else value
+    if "sync_token" in delta:
+        entry["sync_token"] = delta["sync_token"]
+    return entry
+
+
+def merge(state, delta):
+    """
+    Applies a journal entry to a plain-dict `state`, the same way
+    `TodoistAPI._update_state` does for models.  Objects are held in
+    `state[dtype]` as a dict keyed by their primary key.
+    """
+    for key in ("day_orders", "settings_notifications", "user", "user_settings"):
+        if key in delta:
+            state.setdefault(key, {}).update(delta[key])
+    for key in ("day_orders_timestamp", "live_notifications_last_read_id",
+                "locations", "sync_token"):
+        if key in delta:
+            state[key] = delta[key]
+
+    for dtype in model_cls:
+        objs = state.setdefault(dtype, {})
+        for remote_obj in delta.get(dtype, ()):
+            key = object_key(dtype, remote_obj)
+            if is_deleted(remote_obj):
+                objs.pop(key, None)
+            elif key in objs:
+                objs[key].update(remote_obj)
+            else:
+                objs[key] = remote_obj
+    return state
+
+
+def as_delta(state):
+    """Turns a `merge`d state back into a delta for `_update_state`."""
+    delta = dict(state)
+    for dtype in model_cls:
+        delta[dtype] = [dict(obj) for obj in state.get(dtype, {}).values()]
+    return delta
+
+
+class CacheBackend:
+    """
+    The interface of the state caches given as `AsyncTodoistAPI(cache=...)`.
+
+    `write` is called with every sync response (or another delta of
+    `api.state`) and must not block for long, `load` returns the deltas
+    which rebuild the state of `token` when applied in order.
+    """
+
+    def load(self, token):
+        return []
+
+    def write(self, token, delta):
+        pass
+
+    def flush(self):
+        pass
+
+    def close(self):
+        pass
+
+
+class NullCache(CacheBackend):
+    """Caches nothing."""
+
+    def __repr__(self):
+        return f"{__class__.__name__}()"
+
+
+class MemoryCache(CacheBackend):
+    """
+    Keeps the states in this process only, which is useful to re-create
+    `AsyncTodoistAPI` instances of many users without a full sync.
+    """
+
+    def __init__(self):
+        self._states = {}
+
+    def __repr__(self):
+        return f"{__class__.__name__}(tokens={len(self._states)})"
+
+    def load(self, token):
+        if token in self._states:
+            return [as_delta(self._states[token])]
+        return []
+
+    def write(self, token, delta):
+        entry = journal_entry(delta)
+        if entry:
+            merge(self._states.setdefault(token, {}), entry)
+
+
+class SQLiteCache(CacheBackend):
+    """
+    Keeps the states of any number of tokens in one SQLite database, with
+    one row per object, so each sync only upserts the objects it touched.
+
+    Objects of a sync response are complete, so a row is replaced rather
+    than merged.  The connection is only used by a single worker thread.
+    Values are encoded by `codec`, see `get_codec`.
+    """
+
+    _schema = (
+        "CREATE TABLE IF NOT EXISTS objects (token TEXT, dtype TEXT, key TEXT,"
+        " data TEXT, PRIMARY KEY (token, dtype, key))",
+        "CREATE TABLE IF NOT EXISTS scalars (token TEXT, name TEXT,"
+        " value TEXT, PRIMARY KEY (token, name))",
+    )
+
+    def __init__(self, path, codec=None):
+        self.path = os.path.expanduser(path)
+        self.codec = get_codec(codec)
+        self._executor = ThreadPoolExecutor(1, thread_name_prefix="aiotodoist-cache")
+        self._conn = None
+        self._executor.submit(self._connect).result()
+
+    def __repr__(self):
+        return f"{__class__.__name__}({self.path!r})"
+
+    def _connect(self):
+        self._conn = sqlite3.connect(self.path, check_same_thread=False)
+        with self._conn:
+            for stmt in self._schema:
+                self._conn.execute(stmt)
+
+    def load(self, token):
+        return self._executor.submit(self._load, token).result()
+
+    def _load(self, token):
+        delta = {dtype: [] for dtype in model_cls}
+        rows = self._conn.execute(
+            "SELECT name, value FROM scalars WHERE token = ?", (token, ))
+        for name, value in rows:
+            delta[name] = self.codec.loads(value)
+        rows = self._conn.execute(
+            "SELECT dtype, data FROM objects WHERE token = ?", (token, ))
+        for dtype, data in rows:
+            delta[dtype].append(self.codec.loads(data))
+        return [delta] if any(delta.values()) else []
+
+    def write(self, token, delta):
+        entry = journal_entry(delta)
+        if entry:
+            return self._executor.submit(self._write, token, entry)
+
+    def _write(self, token, entry):
+        with self._conn:
+            scalars = {k: v for k, v in entry.items() if k not in model_cls}
+            for name in ("day_orders", "settings_notifications", "user", "user_settings"):
+                if name in scalars:
+                    row = self._conn.execute(
+                        "SELECT value FROM scalars WHERE token = ? AND name = ?",
+                        (token, name)).fetchone()
+                    scalars[name] = {**(self.codec.loads(row[0]) if row else {}),
+                                     **scalars[name]}
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO scalars VALUES (?, ?, ?)",
+                [(token, k, self.codec.dumps(v)) for k, v in scalars.items()])
+
+            upserts, deletes = [], []
+            for dtype in model_cls:
+                for obj in entry.get(dtype, ()):
+                    # keys must not change with the codec.
+                    key = json.dumps(object_key(dtype, obj))
+                    if is_deleted(obj):
+                        deletes.append((token, dtype, key))
+                    else:
+                        upserts.append((token, dtype, key, self.codec.dumps(obj)))
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO objects VALUES (?, ?, ?, ?)", upserts)
+            self._conn.executemany(
+                "DELETE FROM objects WHERE token = ? AND dtype = ? AND key = ?",
+                deletes)
+
+    def flush(self):
+        self._executor.submit(lambda: None).result()
+
+    def close(self):
+        self._executor.submit(self._conn.close)
+        self._executor.shutdown(wait=True)
+
+
+class JournalCache(CacheBackend):
+    """
+    A file cache which keeps the state of each token as a snapshot
+    (`<token>.json` and `<token>.sync`, the files of the origin cache) plus
+    a journal of the sync deltas received after it (`<token>.journal`).
+
+    Each delta is appended as a json line, and once `compact_after` lines
+    were written the journal is folded into a new snapshot.  All file I/O
+    runs on a single worker thread, in the order it was requested.  The
+    files are encoded by `codec`, see `get_codec`.
+    """
+
+    def __init__(self, path, compact_after=100, codec=None):
+        self.path = os.path.expanduser(path)
+        self.codec = get_codec(codec)
+        self.compact_after = compact_after
+        self._executor = ThreadPoolExecutor(1, thread_name_prefix="aiotodoist-cache")
+        self._sizes = {}
+
+        try:
+            os.makedirs(self.path)
+        except OSError:
+            if not os.path.isdir(self.path):
+                raise
+
+    def __repr__(self):
+        return f"{__class__.__name__}({self.path!r})"
+
+    def _file(self, token, suffix):
+        return self.path + token + suffix
+
+    def load(self, token):
+        """Returns the snapshot and the journaled deltas of `token`, in order."""
+        deltas = []
+        try:
+            with open(self._file(token, ".json"), "rb") as f:
+                state = self.codec.loads(f.read())
+            with open(self._file(token, ".sync")) as f:
+                state["sync_token"] = f.read()
+            deltas.append(state)
+        except (OSError, ValueError):
+            pass
+
+        lines = self._read_journal(token)
+        self._sizes[token] = len(lines)
+        return deltas + lines
+
+    def _read_journal(self, token):
+        deltas = []
+        try:
+            with open(self._file(token, ".journal"), encoding="utf-8") as f:
+                for line in f:
+                    try:
+                        deltas.append(self.codec.loads(line))
+                    except ValueError:
+                        break  # an append was interrupted.
+        except OSError:
+            pass
+        return deltas
+
+    def write(self, token, delta):
+        """Schedules `delta` to be appended to the journal of `token`."""
+        entry = journal_entry(delta)
+        if entry:
+            return self._executor.submit(self._append, token, entry)
+
+    def _append(self, token, entry):
+        line = self.codec.dumps(entry)
+        with open(self._file(token, ".journal"), "a", encoding="utf-8") as f:
+            f.write(line + "\n")
+
+        self._sizes[token] = self._sizes.get(token, 0) + 1
+        if self._sizes[token] >= self.compact_after:
+            self._compact(token)
+
+    def compact(self, token):
+        """Schedules the journal of `token` to be folded into its snapshot."""
+        return self._executor.submit(self._compact, token)
+
+    def _compact(self, token):
+        state = {}
+        for delta in self.load(token):
+            merge(state, delta)
+        sync_token = state.pop("sync_token", "*")
+        for dtype in model_cls:
+            state[dtype] = list(state.get(dtype, {}).values())
+
+        tmp = self._file(token, ".json.tmp")
+        with open(tmp, "w", encoding="utf-8") as f:
+            f.write(self.codec.dumps(state))
+        os.replace(tmp, self._file(token, ".json"))
+        with open(self._file(token, ".sync"), "w") as f:
+            f.write(sync_token)
+        # replaying deltas over a newer snapshot gives the same state,
+        # so there is nothing lost if we die before the journal is gone.
+        with open(self._file(token, ".journal"), "w"):
+            pass
+        self._sizes[token] = 0
+
+    def flush(self):
+        """Blocks until every scheduled write is done."""
+        self._executor.submit(lambda: None).result()
+
+    def close(self):
+        self._executor.shutdown(wait=True)
@@ -0,0 +1,83 @@
+import json
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover
+    orjson = None
+
+try:
+    import ujson
+except ImportError:  # pragma: no cover
+    ujson = None
+
+
+class JSONCodec:
+    """
+    Encodes and decodes json with the standard library.  The codecs all
+    take a `default` hook, called with the objects they can not encode
+    (and with dates and times, which are left to the hook), e.g.
+    `todoist.api.json_default` or `aiotodoist.json_default`.
+    """
+
+    name = "json"
+
+    def __repr__(self):
+        return f"{type(self).__name__}()"
+
+    def dumps(self, obj, default=None, indent=None):
+        return json.dumps(obj, default=default, indent=indent, separators=",:")
+
+    def loads(self, s):
+        return json.loads(s)
+
+
+class OrjsonCodec(JSONCodec):
+
+    name = "orjson"
+
+    if orjson is not None:
+        _options = orjson.OPT_NON_STR_KEYS | orjson.OPT_PASSTHROUGH_DATETIME
+
+    def dumps(self, obj, default=None, indent=None):
+        if indent not in (None, 2):  # the only indent of orjson.
+            return super().dumps(obj, default, indent)
+        option = self._options | (orjson.OPT_INDENT_2 if indent else 0)
+        return orjson.dumps(obj, default=default, option=option).decode()
+
+    def loads(self, s):
+        return orjson.loads(s)
+
+
+class UjsonCodec(JSONCodec):
+
+    name = "ujson"
+
+    def dumps(self, obj, default=None, indent=None):
+        return ujson.dumps(obj, default=default, indent=indent or 0,
+                           ensure_ascii=False)
+
+    def loads(self, s):
+        return ujson.loads(s)
+
+
+#: the codecs by name, fastest first.
+codecs = {"orjson": OrjsonCodec, "ujson": UjsonCodec, "json": JSONCodec}
+available = tuple(name for name, module in
+                  (("orjson", orjson), ("ujson", ujson), ("json", json))
+                  if module is not None)
+
+
+def get_codec(codec=None):
+    """
+    Returns a codec for `AsyncTodoistAPI(codec=...)`: the fastest one
+    installed for `None`, or the one of a name in `codecs`.  Any object
+    with the `dumps` and `loads` of `JSONCodec` is returned as is.
+    """
+    if codec is None:
+        codec = available[0]
+    if isinstance(codec, str):
+        if codec not in available:
+            raise ValueError(f"json codec {codec!r} is not available,"
+                             f" choose one of {available}")
+        return codecs[codec]()
+    return codec
@@ -0,0 +1,220 @@
+from sys import intern
+from collections.abc import MutableMapping
+
+from .state import model_cls
+
+#: the fields of the objects which are kept in slots, by resource type.
+#: Other fields are kept in a dict of the object, when there are any.
+FIELDS = {
+    "items": (
+        "id", "legacy_id", "user_id", "project_id", "legacy_project_id",
+        "content", "due", "priority", "parent_id", "legacy_parent_id",
+        "child_order", "section_id", "day_order", "collapsed", "labels",
+        "added_by_uid", "assigned_by_uid", "responsible_uid", "checked",
+        "in_history", "is_deleted", "sync_id", "date_completed", "date_added",
+    ),
+    "projects": (
+        "id", "legacy_id", "name", "color", "parent_id", "legacy_parent_id",
+        "child_order", "collapsed", "shared", "is_deleted", "is_archived",
+        "is_favorite", "sync_id", "inbox_project", "team_inbox",
+    ),
+    "sections": (
+        "id", "name", "project_id", "legacy_project_id", "section_order",
+        "collapsed", "user_id", "sync_id", "is_deleted", "is_archived",
+        "date_archived", "date_added",
+    ),
+    "labels": ("id", "name", "color", "item_order", "is_deleted", "is_favorite"),
+    "notes": (
+        "id", "legacy_id", "posted_uid", "item_id", "legacy_item_id",
+        "project_id", "legacy_project_id", "content", "file_attachment",
+        "uids_to_notify", "is_deleted", "posted", "reactions",
+    ),
+    "reminders": (
+        "id", "notify_uid", "item_id", "service", "type", "due",
+        "mm_offset", "is_deleted",
+    ),
+    "filters": ("id", "name", "query", "color", "item_order", "is_deleted", "is_favorite"),
+}
+
+#: the fields whose values repeat between the objects (dates, colors,
+#: ...), and whose strings are interned, by resource type.  The keys of
+#: the dicts of all the fields are interned too.
+INTERNED_FIELDS = {
+    "items": ("due", "date_completed", "date_added"),
+    "projects": ("color", ),
+    "sections": ("date_archived", "date_added"),
+    "labels": ("name", "color"),
+    "notes": ("posted", ),
+    "reminders": ("service", "type", "due"),
+    "filters": ("color", ),
+}
+
+_unset = object()
+
+
+def compact_value(value, strings=False):
+    """
+    Interns the dict keys of a json value, and its strings if `strings`.
+    """
+    if type(value) is str:
+        return intern(value) if strings else value
+    if type(value) is dict:
+        return {intern(k): compact_value(v, strings) for k, v in value.items()}
+    if type(value) is list:
+        return [compact_value(v, strings) for v in value]
+    return value
+
+
+class RecordData(MutableMapping):
+    """The `data` of a compact model: a dict-like view of its slots."""
+
+    __slots__ = ("_record", )
+
+    def __init__(self, record):
+        self._record = record
+
+    def __repr__(self):
+        return repr(dict(self))
+
+    def __getitem__(self, key):
+        return self._record[key]
+
+    def __setitem__(self, key, value):
+        self._record[key] = value
+
+    def __delitem__(self, key):
+        self._record._delete(key)
+        self._record._changed((key, ))
+
+    def __iter__(self):
+        return self._record._keys()
+
+    def __len__(self):
+        return sum(1 for _ in self._record._keys())
+
+    def __contains__(self, key):
+        return key in self._record
+
+    def get(self, key, default=None):
+        return self._record._get(key, default)
+
+    def copy(self):
+        return dict(self)
+
+    def update(self, *args, **kwargs):
+        changes = dict(*args, **kwargs)
+        record = self._record
+        for key, value in changes.items():
+            record._set(key, value)
+        record._changed(changes)
+
+
+class CompactModel:
+    """
+    The base of the models of `compact_model_cls`: the fields of an
+    object are kept in slots instead of a dict, and `data` is a view of
+    them.  As `ModelView`s, they are pickled without their api.
+    """
+
+    __slots__ = ()
+    _fields = {}
+    _interned = frozenset()
+
+    def __init__(self, data, api):
+        self.api = api
+        self.temp_id = ""
+        self._extra = self._index = None
+        self.data.update(data)
+
+    def __reduce__(self):
+        return type(self), (dict(self.data), None), self.temp_id
+
+    def __setstate__(self, temp_id):
+        self.temp_id = temp_id
+
+    def watch(self, index):
+        """Reindexes the model in `index` when its indexed fields change."""
+        self._index = index
+
+    def _changed(self, keys):
+        index = self._index
+        if index is not None and not index.watched.isdisjoint(keys):
+            index.reindex(self)
+
+    @property
+    def data(self):
+        return RecordData(self)
+
+    @data.setter
+    def data(self, data):
+        for key in list(self._keys()):
+            self._delete(key)
+        self.data.update(data)
+
+    def _get(self, key, default=None):
+        slot = self._fields.get(key)
+        if slot is not None:
+            value = getattr(self, slot, _unset)
+            return default if value is _unset else value
+        if self._extra is None:
+            return default
+        return self._extra.get(key, default)
+
+    def _keys(self):
+        for key, slot in self._fields.items():
+            if hasattr(self, slot):
+                yield key
+        if self._extra:
+            yield from self._extra
+
+    def _delete(self, key):
+        slot = self._fields.get(key)
+        try:
+            if slot is not None:
+                delattr(self, slot)
+            else:
+                del self._extra[key]
+        except (AttributeError, KeyError, TypeError):
+            raise KeyError(key) from None
+
+    def __getitem__(self, key):
+        value = self._get(key, _unset)
+        if value is _unset:
+            raise KeyError(key)
+        return value
+
+    def __setitem__(self, key, value):
+        self._set(key, value)
+        self._changed((key, ))
+
+    def _set(self, key, value):
+        value = compact_value(value, key in self._interned)
+        slot = self._fields.get(key)
+        if slot is not None:
+            setattr(self, slot, value)
+        else:
+            if self._extra is None:
+                self._extra = {}
+            self._extra[intern(key)] = value
+
+    def __contains__(self, key):
+        return self._get(key, _unset) is not _unset
+
+
+def _compact_model(m_cls, fields, interned=()):
+    slots = {field: f"_f_{field}" for field in fields}
+    return type(m_cls.__name__, (CompactModel, m_cls), {
+        "__slots__": ("api", "temp_id", "_extra", "_index", *slots.values()),
+        # named as the origin model, found by pickle as `CompactItem`, ...
+        "__qualname__": f"Compact{m_cls.__name__}",
+        "_fields": slots,
+        "_interned": frozenset(interned),
+    })
+
+
+#: the compact models of the resource types of `FIELDS`: slotted subclasses
+#: of the origin models, with the same names.
+compact_model_cls = {dtype: _compact_model(model_cls[dtype], fields,
+                                            INTERNED_FIELDS.get(dtype, ()))
+                     for dtype, fields in FIELDS.items()}
+globals().update((cls.__qualname__, cls) for cls in compact_model_cls.values())
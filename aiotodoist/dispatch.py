@@ -0,0 +1,114 @@
+import asyncio
+from functools import partial
+
+from .state import object_key
+
+
+class TicksDropped(Exception):
+    """
+    Passed to the error handler of a `Dispatcher` closed with ticks which
+    were not handled yet, as `ticks`.
+    """
+
+    def __init__(self, ticks):
+        super().__init__(f"{len(ticks)} ticks were not handled")
+        self.ticks = ticks
+
+
+class Dispatcher:
+    """
+    Runs the handler of `subscribe()` on `workers` tasks, so that syncing
+    goes on while it works.
+
+    The objects of each tick are split over the workers by their key, so
+    the changes of an object are always handled in order, by the same
+    worker; `others` goes to the first worker with every tick.  Up to
+    `max_lag` calls may wait for a worker, then `put` waits for them.
+
+    With an `executor` (a thread or process pool) the handler is called in
+    it, so it must not be a coroutine function.
+
+    `close` stops the workers at once: `join` first to handle the ticks
+    still queued, else they are passed to the error handler in a
+    `TicksDropped`.
+    """
+
+    def __init__(self, handler, error_handler, workers=4, max_lag=100, executor=None):
+        self.handler = handler
+        self.error_handler = error_handler
+        self.workers = workers
+        self.max_lag = max_lag
+        self.executor = executor
+        self._lanes = []
+        self._tasks = []
+        self._lag = None
+
+    def __repr__(self):
+        return (f"{__class__.__name__}(workers={self.workers}, max_lag={self.max_lag},"
+                f" lag={self.lag})")
+
+    @property
+    def lag(self):
+        """The number of handler calls waiting for a worker."""
+        return sum(lane.qsize() for lane in self._lanes)
+
+    def _start(self):
+        self._lag = asyncio.Semaphore(self.max_lag)
+        self._lanes = [asyncio.Queue() for _ in range(self.workers)]
+        self._tasks = [asyncio.ensure_future(self._work(lane)) for lane in self._lanes]
+
+    def _split(self, infos):
+        *kinds, others = infos
+        lanes = [({}, {}, {}) for _ in range(self.workers)]
+        for kind, views_of in enumerate(kinds):
+            for dtype, views in views_of.items():
+                for view in views:
+                    n = hash((dtype, object_key(dtype, view.data))) % self.workers
+                    lanes[n][kind].setdefault(dtype, []).append(view)
+
+        ticks = []
+        for n, (news, updates, deletes) in enumerate(lanes):
+            if n == 0 or news or updates or deletes:
+                ticks.append((n, (news, updates, deletes, others if n == 0 else {})))
+        return ticks
+
+    async def put(self, infos):
+        """Queues the `(news, updates, deletes, others)` of a tick."""
+        if not self._tasks:
+            self._start()
+        for n, tick in self._split(infos):
+            await self._lag.acquire()
+            self._lanes[n].put_nowait(tick)
+
+    async def _work(self, lane):
+        loop = asyncio.get_running_loop()
+        while True:
+            tick = await lane.get()
+            try:
+                if self.executor is not None:
+                    await loop.run_in_executor(self.executor, partial(self.handler, *tick))
+                else:
+                    coro = self.handler(*tick)
+                    if asyncio.iscoroutine(coro):
+                        await coro
+            except Exception as e:
+                self.error_handler(e)
+            finally:
+                lane.task_done()
+                self._lag.release()
+
+    async def join(self):
+        """Waits until every queued tick was handled."""
+        for lane in self._lanes:
+            await lane.join()
+
+    def close(self):
+        for task in self._tasks:
+            task.cancel()
+        dropped = []
+        for lane in self._lanes:
+            while not lane.empty():
+                dropped.append(lane.get_nowait())
+        self._tasks, self._lanes = [], []
+        if dropped:
+            self.error_handler(TicksDropped(dropped))
@@ -0,0 +1,143 @@
+from threading import get_ident
+from collections import deque
+from asyncio import get_running_loop
+
+CREATED, UPDATED, DELETED = "created", "updated", "deleted"
+
+_missing = object()
+
+
+def field_changes(local, remote):
+    """
+    Returns the fields of a `local` object which a `remote` update changes,
+    as `{field: (old, new)}`.  A field which `local` did not have is old
+    `None`.
+    """
+    changes = {}
+    for key, value in remote.items():
+        old = local.get(key, _missing)
+        if old is _missing:
+            changes[key] = None, value
+        elif old != value:
+            changes[key] = old, value
+    return changes
+
+
+class ChangeStreamOverflow(Exception):
+    """Raised by a `ChangeStream` with `overflow="raise"` which fell behind."""
+
+
+class ChangeEvent:
+    """
+    A change of one object of `api.state`: its `kind` (`CREATED`, `UPDATED`
+    or `DELETED`), resource type `dtype` and `id`, and its data `before`
+    and `after` the change (`None` for a created or deleted object).
+    Both are copies, which later changes of the object do not touch.
+
+    The `changes` of an updated object are the fields which changed, as
+    `{field: (old, new)}` (see `field_changes`), and `None` otherwise.
+    """
+
+    __slots__ = ("kind", "dtype", "id", "before", "after", "changes")
+
+    def __init__(self, kind, dtype, obj_id, before, after, changes=None):
+        self.kind = kind
+        self.dtype = dtype
+        self.id = obj_id
+        self.before = before
+        self.after = after
+        self.changes = changes
+
+    def __repr__(self):
+        return f"{__class__.__name__}({self.kind!r}, {self.dtype!r}, {self.id!r})"
+
+
+class ChangeStream:
+    """
+    The `ChangeEvent`s of an api, as they are merged into its state, see
+    `AsyncTodoistAPI.changes()`.
+
+    Up to `maxsize` events are buffered for a slow consumer, so the syncs
+    never wait for it.  When the buffer is full, the oldest events are
+    dropped (and counted by `dropped`) with `overflow="drop"`, or the
+    stream stops with `ChangeStreamOverflow` once the buffered events
+    were read with `overflow="raise"`.
+    """
+
+    def __init__(self, api, maxsize=1000, overflow="drop"):
+        if overflow not in ("drop", "raise"):
+            raise ValueError(f"unknown overflow {overflow!r}")
+        self.api = api
+        self.maxsize = maxsize
+        self.overflow = overflow
+        self.dropped = 0
+        self.closed = False
+        self._events = deque()
+        self._error = None
+        self._waiter = None
+        # events merged in another thread (`merge="thread"`) are handed over.
+        try:
+            self._loop, self._thread = get_running_loop(), get_ident()
+        except RuntimeError:
+            self._loop = self._thread = None
+
+    def __repr__(self):
+        return (f"{__class__.__name__}(maxsize={self.maxsize}, overflow={self.overflow!r},"
+                f" buffered={len(self._events)}, dropped={self.dropped})")
+
+    def __len__(self):
+        return len(self._events)
+
+    def put(self, events):
+        if self._loop is not None and get_ident() != self._thread:
+            self._loop.call_soon_threadsafe(self.put, events)
+            return
+        if self.closed:
+            return
+        self._events.extend(events)
+        excess = len(self._events) - self.maxsize
+        if self.maxsize and excess > 0:
+            if self.overflow == "raise":
+                for _ in range(excess):
+                    self._events.pop()
+                self._error = ChangeStreamOverflow(
+                    f"more than {self.maxsize} changes were not read")
+                self.close()
+            else:
+                for _ in range(excess):
+                    self._events.popleft()
+                self.dropped += excess
+        self._wakeup()
+
+    def _wakeup(self):
+        if self._waiter is not None and not self._waiter.done():
+            self._waiter.set_result(None)
+
+    def close(self):
+        """Stops the stream after the buffered events."""
+        self.closed = True
+        if self in self.api.change_streams:
+            self.api.change_streams.remove(self)
+        self._wakeup()
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        while not self._events:
+            if self._error is not None:
+                raise self._error
+            if self.closed:
+                raise StopAsyncIteration
+            self._waiter = get_running_loop().create_future()
+            try:
+                await self._waiter
+            finally:
+                self._waiter = None
+        return self._events.popleft()
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info):
+        self.close()
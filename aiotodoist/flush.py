@@ -0,0 +1,148 @@
+from asyncio import ensure_future, gather, get_running_loop
+
+
+class CommandQueue(list):
+    """The `api.queue` of an auto-flushed api, which reports new commands."""
+
+    __slots__ = ("on_append", )
+
+    def __init__(self, iterable=(), on_append=None):
+        super().__init__(iterable)
+        self.on_append = on_append
+
+    def append(self, cmd):
+        super().append(cmd)
+        self.on_append()
+
+    def extend(self, cmds):
+        super().extend(cmds)
+        self.on_append()
+
+    def __iadd__(self, cmds):
+        self.extend(cmds)
+        return self
+
+    def insert(self, i, cmd):
+        super().insert(i, cmd)
+        self.on_append()
+
+
+class AutoFlush:
+    """
+    Commits `api.queue` in the background once it holds `max_commands`
+    commands, or `delay` seconds after the first command was queued.
+
+    `submit` runs a manager method and returns a future of the
+    `sync_status` entry of the command(s) it queued.  When a commit
+    raises, the futures of its commands get the exception, and the ones
+    it did not send are dropped from the queue: submit them again to
+    retry.  `close` stops it without committing: a
+    commit in progress is cancelled (and its commands requeued), and the
+    futures still pending are cancelled.
+    """
+
+    def __init__(self, api, max_commands=100, delay=0.1, **commit_kwargs):
+        self.api = api
+        self.max_commands = max_commands
+        self.delay = delay
+        self.commit_kwargs = commit_kwargs
+        self._futures = {}
+        self._timer = None
+        self._task = None
+        self._again = False
+        api.queue = CommandQueue(api.queue, on_append=self.notify)
+
+    def __repr__(self):
+        return (f"{__class__.__name__}({self.api}, max_commands={self.max_commands},"
+                f" delay={self.delay})")
+
+    def notify(self):
+        if self._task is not None:
+            self._again = True
+        elif len(self.api.queue) >= self.max_commands:
+            self._schedule(0)
+        elif self._timer is None:
+            self._schedule(self.delay)
+
+    def track(self, cmd):
+        """Returns a future of the `sync_status` entry of a queued command."""
+        fut = self._futures.get(cmd["uuid"])
+        if fut is None:
+            fut = self._futures[cmd["uuid"]] = get_running_loop().create_future()
+        return fut
+
+    def submit(self, fn, *args, **kwargs):
+        size = len(self.api.queue)
+        fn(*args, **kwargs)
+        futs = [self.track(cmd) for cmd in self.api.queue[size:]]
+        if len(futs) == 1:
+            return futs[0]
+        return gather(*futs)
+
+    def _schedule(self, delay):
+        if self._timer is not None:
+            self._timer.cancel()
+        self._timer = get_running_loop().call_later(delay, self._start)
+
+    def _start(self):
+        self._timer = None
+        self._again = False
+        self._task = ensure_future(self._flush())
+        self._task.add_done_callback(self._finished)
+
+    def _finished(self, task):
+        if self._task is task:
+            self._task = None
+        if not task.cancelled() and self._again:
+            self.notify()
+
+    async def _flush(self):
+        commands = self.api.queue[:]
+        if not commands:
+            return True
+        try:
+            ret = await self.api.commit(raise_on_error=False, **self.commit_kwargs)
+        except Exception as e:
+            failed = {cmd.get("uuid") for cmd in commands}
+            self.api.queue[:] = [cmd for cmd in self.api.queue if cmd.get("uuid") not in failed]
+            # done: the callers which submit again start a new flush.
+            self._task, self._again = None, False
+            self._resolve(commands, exc=e)
+            return False
+
+        self._again = self._again or bool(self.api.queue)
+        self._resolve(commands, statuses=(ret or {}).get("sync_status", {}))
+        return True
+
+    def _resolve(self, commands, statuses=None, exc=None):
+        for cmd in commands:
+            fut = self._futures.pop(cmd.get("uuid"), None)
+            if fut is None or fut.done():
+                continue
+            if exc is None:
+                fut.set_result(statuses.get(cmd["uuid"]))
+            else:
+                fut.set_exception(exc)
+
+    async def flush(self):
+        """Commits the queued commands now, and waits until it is done."""
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        if self._task is not None:
+            await self._task
+        if self.api.queue:
+            self._start()
+            await self._task
+
+    def close(self):
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+        for fut in self._futures.values():
+            fut.cancel()
+        self._futures.clear()
+        self.api.queue = list(self.api.queue)
@@ -1,4 +1,4 @@
-from asyncio import iscoroutine, ensure_future
+from asyncio import iscoroutine, ensure_future, gather, Queue, Semaphore, CancelledError
 
 from todoist.models import Item, Section
 from todoist.managers.user import UserManager
@@ -14,6 +14,87 @@ from todoist.managers.archive import (ArchiveManager,
                               ItemsArchiveManager)
 
 
+class _GetByIdMixin:
+    """Looks objects up by the index of `api.state` instead of a scan."""
+
+    def get_by_id(self, obj_id, only_local=False):
+        obj = self.api._objects(self.state_name).index.get(obj_id)
+        if obj is not None or only_local or self.object_type is None:
+            return obj
+
+        data = self.get(obj_id)
+        # retrieves from state, otherwise we return the raw data
+        obj = self.api._objects(self.state_name).index.get(obj_id)
+        return data if obj is None else obj
+
+    def _get_object(self, call, obj_id, **params):
+        def _callback(fut=None, obj=None):
+            obj = obj if fut is None else fut.result()
+            if obj and "error" in obj:
+                # ???: the origin behavior return `None` when error occurred,
+                # which actually made return type inconsitent, so we change
+                # it to return the same type but with empty content.
+                obj.clear()
+            else:
+                self.api._update_state(self._to_state(obj))
+
+        pending = self.api.responses.get(call, obj_id)
+        if pending is not None:
+            return pending
+
+        params = dict(token=self.token, **params)
+        obj = self.api._get(call, params=params)
+        if iscoroutine(obj):
+            obj = ensure_future(obj)
+            obj.add_done_callback(_callback)
+            self.api.responses.track(call, obj_id, obj)
+        else:
+            _callback(obj=obj)
+        return obj
+
+    async def _get_many(self, call, param, obj_ids, concurrency):
+        """
+        Fetches `obj_ids` with at most `concurrency` requests at a time, and
+        merges all of them into the state at once.  The responses are
+        returned in the order of `obj_ids`; an error response is kept as-is,
+        and a failed request is returned as its exception.
+        """
+        async def _request(obj_id):
+            async with sem:
+                params = {"token": self.token, param: obj_id}
+                return await self.api._get_async(call, params=params)
+
+        async def _fetch(obj_id):
+            pending = self.api.responses.get(call, obj_id)
+            if pending is not None:
+                return await pending, False
+            # shared with the get() calls made meanwhile, and cached once
+            # merged, as `_get_object` does.
+            fut = ensure_future(_request(obj_id))
+            self.api.responses.track(call, obj_id, fut, cache=False)
+            return await fut, True
+
+        sem = Semaphore(concurrency)
+        uniq = list(dict.fromkeys(obj_ids))
+        rets = await gather(*map(_fetch, uniq), return_exceptions=True)
+
+        data, resps, fresh = {}, {}, []
+        for obj_id, ret in zip(uniq, rets):
+            if isinstance(ret, BaseException):
+                resps[obj_id] = ret
+                continue
+            resp, fetched = ret
+            resps[obj_id] = resp
+            if fetched and isinstance(resp, dict) and "error" not in resp:
+                fresh.append((obj_id, resp))
+                for dtype, objs in self._to_state(resp).items():
+                    data.setdefault(dtype, []).extend(objs)
+        self.api._update_state(data)
+        for obj_id, resp in fresh:
+            self.api.responses.store(call, obj_id, resp)
+        return [resps[obj_id] for obj_id in obj_ids]
+
+
 class AsyncUserManager(UserManager):
     def login(self, email, password):
         def _callback(fut=None, data=None):
@@ -60,194 +141,124 @@ class AsyncUserManager(UserManager):
         return resp
 
 
-class AsyncFiltersManager(FiltersManager):
+class AsyncFiltersManager(_GetByIdMixin, FiltersManager):
 
     def get(self, filter_id):
-        def _callback(fut=None, obj=None):
-            obj = obj or fut.result()
-            data = dict(filters=[])
-            if obj.get("filter"):
-                data["filters"].append(obj.get("filter"))
-            self.api._update_state(data)
-
-        params = dict(token=self.token, filter_id=filter_id)
-        obj = self.api._get("filters/get", params=params)
-        if iscoroutine(obj):
-            obj = ensure_future(obj)
-            obj.add_done_callback(_callback)
-        else:
-            _callback(obj=obj)
-        return obj
+        return self._get_object("filters/get", filter_id, filter_id=filter_id)
+
+    def _to_state(self, obj):
+        data = dict(filters=[])
+        if obj.get("filter"):
+            data["filters"].append(obj.get("filter"))
+        return data
 
 
-class AsyncItemsManager(ItemsManager):
+class AsyncItemsManager(_GetByIdMixin, ItemsManager):
 
     def get(self, item_id):
-        def _callback(fut=None, obj=None):
-            obj = obj or fut.result()
-            if obj and "error" in obj:
-                # ???: the origin behavior return `None` when error occurred,
-                # which actually made return type inconsitent, so we change
-                # it to return the same type but with empty content.
-                obj.clear()
-            else:
-                data = dict(projects=[], items=[], notes=[])
-                if obj.get("project"):
-                    data["projects"].append(obj.get("project"))
-                if obj.get("item"):
-                    data["items"].append(obj.get("item"))
-                if obj.get("notes"):
-                    data["notes"].extend(obj.get("notes"))
-                self.api._update_state(data)
-
-        params = dict(token=self.token, item_id=item_id)
-        obj = self.api._get("items/get", params=params)
-        if iscoroutine(obj):
-            obj = ensure_future(obj)
-            obj.add_done_callback(_callback)
-        else:
-            _callback(obj=obj)
-        return obj
+        return self._get_object("items/get", item_id, item_id=item_id)
+
+    def get_many(self, item_ids, concurrency=8):
+        return self._get_many("items/get", "item_id", item_ids, concurrency)
+
+    def _to_state(self, obj):
+        data = dict(projects=[], items=[], notes=[])
+        if obj.get("project"):
+            data["projects"].append(obj.get("project"))
+        if obj.get("item"):
+            data["items"].append(obj.get("item"))
+        if obj.get("notes"):
+            data["notes"].extend(obj.get("notes"))
+        return data
 
 
-class AsyncLabelsManager(LabelsManager):
+class AsyncLabelsManager(_GetByIdMixin, LabelsManager):
 
     def get(self, label_id):
-        def _callback(fut=None, obj=None):
-            obj = obj or fut.result()
-            if obj and "error" in obj:
-                obj.empty()
-            else:
-                data = dict(labels=[])
-                if obj.get("label"):
-                    data["labels"].append(obj.get("label"))
-                self.api._update_state(data)
+        return self._get_object("labels/get", label_id, label_id=label_id)
 
-        params = dict(token=self.token, label_id=label_id)
-        obj = self.api._get("labels/get", params=params)
-        if iscoroutine(obj):
-            obj = ensure_future(obj)
-            obj.add_done_callback(_callback)
-        else:
-            _callback(obj=obj)
-        return obj
+    def get_many(self, label_ids, concurrency=8):
+        return self._get_many("labels/get", "label_id", label_ids, concurrency)
+
+    def _to_state(self, obj):
+        data = dict(labels=[])
+        if obj.get("label"):
+            data["labels"].append(obj.get("label"))
+        return data
 
 
-class AsyncNotesManager(NotesManager):
+class AsyncNotesManager(_GetByIdMixin, NotesManager):
 
     def get(self, note_id):
-        def _callback(fut=None, obj=None):
-            obj = obj or fut.result()
-            if obj and "error" in obj:
-                obj.empty()
-            else:
-                data = dict(notes=[])
-                if obj.get("note"):
-                    data["notes"].append(obj.get("note"))
-                    self.api._update_state(data)
+        return self._get_object("notes/get", note_id, note_id=note_id)
 
-        params = dict(token=self.token, note_id=note_id)
-        obj = self.api._get("notes/get", params=params)
-        if iscoroutine(obj):
-            obj = ensure_future(obj)
-            obj.add_done_callback(_callback)
-        else:
-            _callback(obj=obj)
-        return obj
+    def get_many(self, note_ids, concurrency=8):
+        return self._get_many("notes/get", "note_id", note_ids, concurrency)
+
+    def _to_state(self, obj):
+        data = dict(notes=[])
+        if obj.get("note"):
+            data["notes"].append(obj.get("note"))
+        return data
 
 
-class AsyncProjectNotesManager(ProjectNotesManager):
+class AsyncProjectNotesManager(_GetByIdMixin, ProjectNotesManager):
 
     def get(self, note_id):
-        def _callback(fut=None, obj=None):
-            obj = obj or fut.result()
-            if obj and "error" in obj:
-                obj.empty()
-            else:
-                data = dict(project_notes=[])
-                if obj.get("note"):
-                    data["project_notes"].append(obj.get("note"))
-                    self.api._update_state(data)
+        return self._get_object("notes/get", note_id, note_id=note_id)
 
-        params = dict(token=self.token, note_id=note_id)
-        obj = self.api._get("notes/get", params=params)
-        if iscoroutine(obj):
-            obj = ensure_future(obj)
-            obj.add_done_callback(_callback)
-        else:
-            _callback(obj=obj)
-        return obj
+    def _to_state(self, obj):
+        data = dict(project_notes=[])
+        if obj.get("note"):
+            data["project_notes"].append(obj.get("note"))
+        return data
 
 
-class AsyncProjectsManager(ProjectsManager):
+class AsyncProjectsManager(_GetByIdMixin, ProjectsManager):
 
     def get(self, project_id):
-        def _callback(fut=None, obj=None):
-            obj = obj or fut.result()
-            if obj and "error" in obj:
-                obj.empty()
-            else:
-                data = dict(projects=[], project_notes=[])
-                if obj.get("project"):
-                    data["projects"].append(obj.get("project"))
-                if obj.get("notes"):
-                    data["project_notes"].extend(obj.get("notes"))
-                self.api._update_state(data)
-
-        params = dict(token=self.token, project_id=project_id)
-        obj = self.api._get("projects/get", params=params)
-        if iscoroutine(obj):
-            obj = ensure_future(obj)
-            obj.add_done_callback(_callback)
-        else:
-            _callback(obj=obj)
-        return obj
+        return self._get_object("projects/get", project_id, project_id=project_id)
+
+    def get_many(self, project_ids, concurrency=8):
+        return self._get_many("projects/get", "project_id", project_ids, concurrency)
+
+    def _to_state(self, obj):
+        data = dict(projects=[], project_notes=[])
+        if obj.get("project"):
+            data["projects"].append(obj.get("project"))
+        if obj.get("notes"):
+            data["project_notes"].extend(obj.get("notes"))
+        return data
 
 
-class AsyncRemindersManager(RemindersManager):
+class AsyncRemindersManager(_GetByIdMixin, RemindersManager):
 
     def get(self, reminder_id):
-        def _callback(fut=None, obj=None):
-            obj = obj or fut.result()
-            if obj and "error" in obj:
-                obj.empty()
-            else:
-                data = dict(reminders=[])
-                if obj.get("reminder"):
-                    data["reminders"].append(obj.get("reminder"))
-                self.api._update_state(data)
+        return self._get_object("reminders/get", reminder_id, reminder_id=reminder_id)
 
-        params = dict(token=self.token, reminder_id=reminder_id)
-        obj = self.api._get("reminders/get", params=params)
-        if iscoroutine(obj):
-            obj = ensure_future(obj)
-            obj.add_done_callback(_callback)
-        else:
-            _callback(obj=obj)
-        return obj
+    def get_many(self, reminder_ids, concurrency=8):
+        return self._get_many("reminders/get", "reminder_id", reminder_ids, concurrency)
+
+    def _to_state(self, obj):
+        data = dict(reminders=[])
+        if obj.get("reminder"):
+            data["reminders"].append(obj.get("reminder"))
+        return data
 
 
-class AsyncSectionsManager(SectionsManager):
+class AsyncSectionsManager(_GetByIdMixin, SectionsManager):
 
     def get(self, section_id):
-        def _callback(fut=None, obj=None):
-            obj = obj or fut.result()
-            if obj and "error" in obj:
-                obj.empty()
-            else:
-                data = dict(sections=[])
-                if obj.get("section"):
-                    data["sections"].append(obj.get("section"))
-                self.api._update_state(data)
+        return self._get_object("sections/get", section_id, section_id=section_id)
 
-        params = dict(token=self.token, section_id=section_id)
-        obj = self.api._get("sections/get", params=params)
-        if iscoroutine(obj):
-            obj = ensure_future(obj)
-            obj.add_done_callback(_callback)
-        else:
-            _callback(obj=obj)
-        return obj
+    def get_many(self, section_ids, concurrency=8):
+        return self._get_many("sections/get", "section_id", section_ids, concurrency)
+
+    def _to_state(self, obj):
+        data = dict(sections=[])
+        if obj.get("section"):
+            data["sections"].append(obj.get("section"))
+        return data
 
 
 class _AsyncArchiveManager(ArchiveManager):
@@ -265,22 +276,84 @@ class _AsyncArchiveManager(ArchiveManager):
         return resp.json()
 
     async def _next_page_async(self, cursor):
-        resp = await self.api.session.get(
+        resp = await self.api.transport.request(
+            self.api.session, "get",
             self._next_url(),
             params=self._next_query_params(cursor),
             headers=self._request_headers(),
         )
         resp.raise_for_status()
-        return await resp.json()
-
-    async def __aiter__(self):
-        has_more, cursor = True, None
-        while has_more:
-            resp = await self.next_page(cursor)
-            has_more, cursor = resp["has_more"], resp.get("next_cursor")
-            elms = (self._make_element(data) for data in resp[self.element_type])
-            for el in elms:
-                yield el
+        return await resp.json(loads=self.api.codec.loads)
+
+    def __aiter__(self):
+        return self._aiterate()
+
+    def _pages(self, first=None):
+        # the first page was requested already to find out the session kind.
+        resp = self.next_page(None) if first is None else first
+        while True:
+            yield resp
+            if not resp["has_more"]:
+                break
+            resp = self.next_page(resp.get("next_cursor"))
+
+    def _iterate(self, first=None):
+        for resp in self._pages(first):
+            for data in resp[self.element_type]:
+                yield self._make_element(data)
+
+    async def _aiterate(self, first=None, depth=2):
+        """
+        Yields the elements of the archive, while up to `depth` next pages
+        are requested in the background.
+        """
+        pages = Queue(max(1, depth))
+
+        async def _produce():
+            try:
+                resp = await (self.next_page(None) if first is None else first)
+                while True:
+                    await pages.put(resp)
+                    if not resp["has_more"]:
+                        break
+                    resp = await self.next_page(resp.get("next_cursor"))
+                await pages.put(None)
+            except CancelledError:
+                raise
+            except Exception as e:
+                await pages.put(e)
+
+        producer = ensure_future(_produce())
+        try:
+            while True:
+                resp = await pages.get()
+                if resp is None:
+                    break
+                if isinstance(resp, Exception):
+                    raise resp
+                for data in resp[self.element_type]:
+                    yield self._make_element(data)
+        finally:
+            producer.cancel()
+
+    def _elements(self, depth):
+        first = self.next_page(None)
+        if iscoroutine(first):
+            # the requests start with the iteration, so that an iterator
+            # which is never used leaves no task behind.
+            first.close()
+            return self._aiterate(depth=depth)
+        return self._iterate(first)
+
+
+async def _collect_archives(managers, method, concurrency, depth):
+    sem = Semaphore(concurrency)
+
+    async def _collect(manager):
+        async with sem:
+            return [el async for el in getattr(manager, method)(depth)]
+
+    return await gather(*[_collect(manager) for manager in managers])
 
 
 class AsyncSectionsArchiveManager(_AsyncArchiveManager):
@@ -294,11 +367,8 @@ class AsyncSectionsArchiveManager(_AsyncArchiveManager):
     def __repr__(self):
         return f'{__class__.__name__}("project_id"={project_id})'
 
-    def sections(self):
-        if iscoroutine(self.next_page(None)):
-            return self.__aiter__()
-        else:
-            return self._iterate()
+    def sections(self, depth=2):
+        return self._elements(depth)
 
     def _next_query_params(self, cursor):
         rv = super()._next_query_params(cursor)
@@ -326,13 +396,8 @@ class AsyncItemsArchiveManager(_AsyncArchiveManager):
         rv.update([self._locate_info])
         return rv
 
-    def items(self):
-        data = self.next_page(None)
-        if iscoroutine(data):
-            data.close()
-            return self.__aiter__()
-        else:
-            return self._iterate()
+    def items(self, depth=2):
+        return self._elements(depth)
 
 
 class AsyncSectionsArchiveManagerMaker:
@@ -348,6 +413,12 @@ class AsyncSectionsArchiveManagerMaker:
     def for_project(self, project_id):
         return AsyncSectionsArchiveManager(self.api, project_id)
 
+    async def for_projects(self, project_ids, concurrency=8, depth=2):
+        """Returns the archived sections of many projects, by project id."""
+        managers = [self.for_project(project_id) for project_id in project_ids]
+        sections = await _collect_archives(managers, "sections", concurrency, depth)
+        return dict(zip(project_ids, sections))
+
 
 class AsyncItemsArchiveManagerMaker:
 
@@ -362,6 +433,12 @@ class AsyncItemsArchiveManagerMaker:
     def for_project(self, project_id):
         return AsyncItemsArchiveManager(self.api, "project", project_id)
 
+    async def for_projects(self, project_ids, concurrency=8, depth=2):
+        """Returns the archived items of many projects, by project id."""
+        managers = [self.for_project(project_id) for project_id in project_ids]
+        items = await _collect_archives(managers, "items", concurrency, depth)
+        return dict(zip(project_ids, items))
+
     def for_section(self, section_id):
         return AsyncItemsArchiveManager(self.api, "section", section_id)
 
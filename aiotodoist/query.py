@@ -0,0 +1,58 @@
+from datetime import date
+from heapq import nsmallest
+
+from .state import index_values
+
+_missing = object()
+
+
+def _day(value):
+    return value.isoformat()[:10] if isinstance(value, date) else value
+
+
+def _sort_key(field):
+    def key(obj):
+        value = obj.data.get(field)
+        if field == "due" or isinstance(value, list):
+            # due dates by their day, lists by their values.
+            value = index_values(obj.data, field) or None
+        return value is None, value
+    return key
+
+
+def select(objs, order_by=None, reverse=False, limit=None,
+           due_from=None, due_before=None, **filters):
+    """
+    Returns the models of the `StateList` `objs` which match all `filters`,
+    see `AsyncTodoistAPI.select`.
+    """
+    index = objs.index
+    candidates, rest = [], {}
+    for field, value in filters.items():
+        if field in index.fields:
+            if field == "due":
+                value = _day(value)
+            candidates.append(index.bucket(field, value))
+        else:
+            rest[field] = value
+    if due_from is not None or due_before is not None:
+        candidates.append(index.lookup_range("due", _day(due_from), _day(due_before)))
+
+    if candidates:
+        # walk the smallest bucket, check the others by id.
+        candidates.sort(key=len)
+        first, others = candidates[0], candidates[1:]
+        found = [obj for key, obj in first.items() if all(key in other for other in others)]
+    else:
+        found = list(objs)
+
+    if rest:
+        found = [obj for obj in found
+                 if all(obj.data.get(field, _missing) == value for field, value in rest.items())]
+
+    if order_by is not None:
+        key = _sort_key(order_by)
+        if limit is not None and not reverse:
+            return nsmallest(limit, found, key=key)
+        found.sort(key=key, reverse=reverse)
+    return found if limit is None else found[:limit]
@@ -0,0 +1,99 @@
+from time import monotonic
+from asyncio import shield, get_running_loop
+from collections import OrderedDict
+
+#: the endpoint whose response caches an object of a resource type.
+GET_CALLS = {
+    "filters": "filters/get",
+    "items": "items/get",
+    "labels": "labels/get",
+    "notes": "notes/get",
+    "project_notes": "notes/get",
+    "projects": "projects/get",
+    "reminders": "reminders/get",
+    "sections": "sections/get",
+}
+
+
+class ResponseCache:
+    """
+    Shares the futures of the per-object `get()` calls of the managers.
+
+    Concurrent calls for the same (endpoint, id) wait for a single request,
+    and with a positive `ttl` the responses are kept for `ttl` seconds, up
+    to `maxsize` entries evicted by least recent use.  An entry is dropped
+    as soon as a sync delta touches its object, and a request in flight
+    then is answered but not cached.
+    """
+
+    def __init__(self, ttl=0, maxsize=1024):
+        self.ttl = ttl
+        self.maxsize = maxsize
+        self._pending = {}
+        self._cache = OrderedDict()
+
+    def __repr__(self):
+        return (f"{__class__.__name__}(ttl={self.ttl}, maxsize={self.maxsize},"
+                f" pending={len(self._pending)}, cached={len(self._cache)})")
+
+    def __len__(self):
+        return len(self._pending) + len(self._cache)
+
+    def get(self, call, obj_id):
+        """Returns a future of the response for (call, obj_id), if any."""
+        key = call, obj_id
+        if key in self._pending:
+            return shield(self._pending[key])
+
+        entry = self._cache.get(key)
+        if entry is not None:
+            expires, resp = entry
+            if expires > monotonic():
+                self._cache.move_to_end(key)
+                fut = get_running_loop().create_future()
+                fut.set_result(resp)
+                return fut
+            del self._cache[key]
+        return None
+
+    def track(self, call, obj_id, fut, cache=True):
+        """
+        Shares `fut`, the request for (call, obj_id), until it is done, and
+        caches its response unless not `cache` (see `store`).
+        """
+        key = call, obj_id
+        self._pending[key] = fut
+        fut.add_done_callback(lambda f: self._done(key, f, cache))
+
+    def _done(self, key, fut, cache=True):
+        if self._pending.get(key) is not fut:
+            return  # invalidated while in flight, so it may be stale.
+        del self._pending[key]
+        if not cache or fut.cancelled() or fut.exception() is not None:
+            return
+        self._store(key, fut.result())
+
+    def store(self, call, obj_id, resp):
+        """Caches `resp` for (call, obj_id)."""
+        self._store((call, obj_id), resp)
+
+    def _store(self, key, resp):
+        # errors were emptied by the managers, never cache them.
+        if self.ttl <= 0 or not resp or "error" in resp:
+            return
+        self._cache[key] = monotonic() + self.ttl, resp
+        self._cache.move_to_end(key)
+        while len(self._cache) > self.maxsize:
+            self._cache.popitem(last=False)
+
+    def invalidate(self, dtype, obj_id):
+        call = GET_CALLS.get(dtype)
+        if call is not None:
+            self._cache.pop((call, obj_id), None)
+            fut = self._pending.get((call, obj_id))
+            if fut is not None and not fut.done():
+                # the next get() sends a new request.
+                del self._pending[call, obj_id]
+
+    def clear(self):
+        self._cache.clear()
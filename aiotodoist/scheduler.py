@@ -0,0 +1,158 @@
+import asyncio
+from time import monotonic
+from heapq import heappush, heappop
+from random import uniform
+from itertools import count
+
+from .subscribe import AdaptiveInterval, _changes, _collect, _dispatch
+
+
+class _Account:
+
+    __slots__ = ("api", "handler", "error_handler", "interval", "resource_types",
+                 "ticks", "hook", "due", "seq", "busy")
+
+    def __init__(self, api, handler, error_handler, interval,
+                 resource_types=None, predicate=None):
+        self.api = api
+        self.handler = handler
+        self.error_handler = error_handler
+        self.interval = interval
+        self.resource_types = resource_types
+        self.ticks = []
+        self.hook = _collect(api, self.ticks, error_handler, resource_types, predicate)
+        self.due = self.seq = None
+        self.busy = False
+
+
+class SyncScheduler:
+    """
+    Polls many `AsyncTodoistAPI`s, as `subscribe()` does for one, with at
+    most `concurrency` syncs in flight.
+
+    Each account has its own `AdaptiveInterval` between `min_delay` and
+    `max_delay`, randomized by +/- `jitter` so that accounts do not wake up
+    together.  Accounts with queued commands are polled (and committed)
+    first, as soon as a worker is free.
+    """
+
+    #: seconds between two checks for queued commands.
+    check_every = 1
+
+    def __init__(self, concurrency=20, min_delay=5, max_delay=300, factor=2,
+                 jitter=0.2, relax=1):
+        self.concurrency = concurrency
+        self.min_delay = min_delay
+        self.max_delay = max_delay
+        self.factor = factor
+        self.jitter = jitter
+        self.relax = relax
+        self._accounts = {}
+        self._heap = []
+        self._seq = count()
+
+    def __repr__(self):
+        return (f"{__class__.__name__}(accounts={len(self._accounts)},"
+                f" concurrency={self.concurrency})")
+
+    def __len__(self):
+        return len(self._accounts)
+
+    def add(self, api, handler, error_handler, resource_types=None, predicate=None):
+        """Polls `api` as `subscribe()` does, see its arguments."""
+        interval = AdaptiveInterval(self.min_delay, self.max_delay, self.factor)
+        account = _Account(api, handler, error_handler, interval,
+                           resource_types, predicate)
+        api.response_hooks.append(account.hook)
+        self._accounts[id(api)] = account
+        # spread the first polls over the first interval.
+        self._push(account, monotonic() + uniform(0, self.min_delay))
+
+    def remove(self, api):
+        account = self._accounts.pop(id(api), None)
+        if account is not None:
+            api.response_hooks.remove(account.hook)
+            account.seq = None  # drops its entry in the heap.
+
+    def _push(self, account, due, priority=1):
+        account.due, account.seq = due, next(self._seq)
+        heappush(self._heap, (due, priority, account.seq, account))
+
+    def _promote(self, now):
+        for account in self._accounts.values():
+            if account.api.queue and not account.busy and account.due > now:
+                self._push(account, now, priority=0)
+
+    def _pop(self, now):
+        while self._heap:
+            due, _, seq, account = self._heap[0]
+            if seq != account.seq:
+                heappop(self._heap)
+            elif due <= now:
+                heappop(self._heap)
+                return account, None
+            else:
+                return None, due - now
+        return None, self.check_every
+
+    async def _poll(self, account):
+        api, delay = account.api, None
+        try:
+            if api.queue:
+                await api.commit()
+            else:
+                await api.sync(resource_types=account.resource_types)
+        except Exception as e:
+            account.error_handler(e)
+            delay = self.relax
+
+        changes = _changes(account.ticks)
+        await _dispatch(account.handler, account.error_handler, account.ticks)
+        if delay is None:
+            delay = account.interval.update(changes)
+            delay *= uniform(1 - self.jitter, 1 + self.jitter)
+        return delay
+
+    async def _run_one(self, account, sem):
+        delay = self.relax
+        try:
+            delay = await self._poll(account)
+        except Exception as e:
+            # the error handler of the account raised.
+            asyncio.get_running_loop().call_exception_handler(dict(
+                message=f"polling {account.api} failed", exception=e))
+        finally:
+            account.busy = False
+            sem.release()
+            if id(account.api) in self._accounts:
+                self._push(account, monotonic() + delay)
+
+    async def run(self):
+        sem = asyncio.Semaphore(self.concurrency)
+        tasks = set()
+        checked = 0
+        try:
+            while True:
+                await sem.acquire()
+                now = monotonic()
+                if now - checked >= self.check_every:
+                    self._promote(now)
+                    checked = now
+
+                account, wait = self._pop(now)
+                if account is None:
+                    sem.release()
+                    await asyncio.sleep(min(wait, self.check_every))
+                    continue
+
+                account.busy = True
+                task = asyncio.ensure_future(self._run_one(account, sem))
+                tasks.add(task)
+                task.add_done_callback(tasks.discard)
+        finally:
+            for task in tasks:
+                task.cancel()
+
+    def close(self):
+        for account in list(self._accounts.values()):
+            self.remove(account.api)
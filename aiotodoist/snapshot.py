@@ -0,0 +1,192 @@
+from types import MappingProxyType
+from collections.abc import Mapping
+
+_BITS = 5
+_MASK = (1 << _BITS) - 1
+_HASH_BITS = 64
+
+
+def _hash(key):
+    return hash(key) & ((1 << _HASH_BITS) - 1)
+
+
+class _Leaf:
+    """The pairs of one hash: a single one, unless hashes collide."""
+
+    __slots__ = ("hash", "pairs")
+
+    def __init__(self, h, pairs):
+        self.hash = h
+        self.pairs = pairs
+
+
+def _get(node, shift, h, key):
+    while node is not None:
+        entry = node[(h >> shift) & _MASK]
+        if type(entry) is _Leaf:
+            if entry.hash == h:
+                for k, v in entry.pairs:
+                    if k == key:
+                        return True, v
+            return False, None
+        node, shift = entry, shift + _BITS
+    return False, None
+
+
+def _assoc(node, shift, h, key, value):
+    """Returns a copy of `node` with `key` set, and whether it was added."""
+    idx = (h >> shift) & _MASK
+    entry = node[idx] if node is not None else None
+    if entry is None:
+        new, added = _Leaf(h, ((key, value), )), True
+    elif type(entry) is _Leaf:
+        if entry.hash == h:
+            pairs = tuple(p for p in entry.pairs if p[0] != key)
+            added = len(pairs) == len(entry.pairs)
+            new = _Leaf(h, pairs + ((key, value), ))
+        else:
+            # push the leaf one level down, next to the new one.
+            sub = [None] * (1 << _BITS)
+            sub[(entry.hash >> (shift + _BITS)) & _MASK] = entry
+            new, added = _assoc(tuple(sub), shift + _BITS, h, key, value)
+    else:
+        new, added = _assoc(entry, shift + _BITS, h, key, value)
+
+    copied = list(node) if node is not None else [None] * (1 << _BITS)
+    copied[idx] = new
+    return tuple(copied), added
+
+
+def _dissoc(node, shift, h, key):
+    """Returns a copy of `node` without `key` (or `node` if it is not in)."""
+    if node is None:
+        return None
+    idx = (h >> shift) & _MASK
+    entry = node[idx]
+    if entry is None:
+        return node
+    if type(entry) is _Leaf:
+        if entry.hash != h:
+            return node
+        pairs = tuple(p for p in entry.pairs if p[0] != key)
+        if len(pairs) == len(entry.pairs):
+            return node
+        new = _Leaf(h, pairs) if pairs else None
+    else:
+        new = _dissoc(entry, shift + _BITS, h, key)
+        if new is entry:
+            return node
+
+    copied = list(node)
+    copied[idx] = new
+    if not any(copied):
+        return None
+    return tuple(copied)
+
+
+def _walk(node):
+    if node is None:
+        return
+    for entry in node:
+        if entry is None:
+            continue
+        if type(entry) is _Leaf:
+            yield from entry.pairs
+        else:
+            yield from _walk(entry)
+
+
+class PMap(Mapping):
+    """
+    An immutable mapping (a hash array mapped trie): `set` and `delete`
+    return a new map which shares all but the changed path with this one.
+    """
+
+    __slots__ = ("_root", "_len")
+
+    def __init__(self, items=()):
+        self._root, self._len = None, 0
+        for key, value in (items.items() if isinstance(items, Mapping) else items):
+            self._root, added = _assoc(self._root, 0, _hash(key), key, value)
+            self._len += added
+
+    @classmethod
+    def _make(cls, root, length):
+        new = cls.__new__(cls)
+        new._root, new._len = root, length
+        return new
+
+    def __repr__(self):
+        return f"{__class__.__name__}({dict(self)!r})"
+
+    def __len__(self):
+        return self._len
+
+    def __iter__(self):
+        return (key for key, _ in _walk(self._root))
+
+    def items(self):
+        return _walk(self._root)
+
+    def values(self):
+        return (value for _, value in _walk(self._root))
+
+    def __getitem__(self, key):
+        found, value = _get(self._root, 0, _hash(key), key)
+        if not found:
+            raise KeyError(key)
+        return value
+
+    def __contains__(self, key):
+        return _get(self._root, 0, _hash(key), key)[0]
+
+    def set(self, key, value):
+        root, added = _assoc(self._root, 0, _hash(key), key, value)
+        return self._make(root, self._len + added)
+
+    def delete(self, key):
+        root = _dissoc(self._root, 0, _hash(key), key)
+        if root is self._root:
+            return self
+        return self._make(root, self._len - 1)
+
+
+def freeze(value):
+    """An immutable copy of the json-like `value`."""
+    if isinstance(value, Mapping):
+        return MappingProxyType({k: freeze(v) for k, v in value.items()})
+    if isinstance(value, list):
+        return tuple(freeze(v) for v in value)
+    return value
+
+
+class StateSnapshot:
+    """
+    The state of an api at `sync_token`, see `AsyncTodoistAPI.snapshot()`.
+
+    `snapshot[dtype]` is a `PMap` of the objects of a resource type by
+    their key (see `state.object_key`), as frozen copies of their data,
+    and the other keys are frozen copies of the state values.  It never
+    changes, whatever is merged into the api afterwards.
+    """
+
+    __slots__ = ("sync_token", "_state")
+
+    def __init__(self, sync_token, state):
+        self.sync_token = sync_token
+        self._state = state
+
+    def __repr__(self):
+        return f"{__class__.__name__}(sync_token={self.sync_token!r})"
+
+    def __getitem__(self, key):
+        return self._state[key]
+
+    def __contains__(self, key):
+        return key in self._state
+
+    def keys(self):
+        return self._state.keys()
+
+    def get_by_id(self, dtype, key, default=None):
+        return self._state[dtype].get(key, default)
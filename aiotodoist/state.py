@@ -0,0 +1,353 @@
+from bisect import bisect_left, insort
+
+from todoist import models
+
+#: resource types which are kept as a list of models in `api.state`.
+model_cls = {
+    "collaborators": models.Collaborator,
+    "collaborator_states": models.CollaboratorState,
+    "filters": models.Filter,
+    "items": models.Item,
+    "labels": models.Label,
+    "live_notifications": models.LiveNotification,
+    "notes": models.Note,
+    "project_notes": models.ProjectNote,
+    "projects": models.Project,
+    "reminders": models.Reminder,
+    "sections": models.Section,
+}
+
+#: fields that every resource type gets a secondary index for.
+INDEXED_FIELDS = ("project_id", "section_id", "parent_id", "item_id")
+
+#: the indexed fields which may refer to the temporary id of a new object.
+REFERENCE_FIELDS = INDEXED_FIELDS
+
+#: resource types whose objects are created locally with a temporary id.
+TEMP_ID_TYPES = ("filters", "items", "labels", "notes",
+                 "project_notes", "projects", "reminders", "sections")
+
+#: the extra indexed fields of some resource types, for `select()`.
+TYPE_FIELDS = {
+    "items": ("labels", "checked", "due"),
+}
+
+#: indexed fields whose values are also kept sorted, for range lookups.
+RANGE_FIELDS = ("due", )
+
+
+def object_key(dtype, data):
+    """The primary key of a raw object (or model) of resource type `dtype`."""
+    if dtype == "collaborator_states":
+        return data["project_id"], data["user_id"]
+    return data["id"]
+
+
+def is_deleted(data):
+    # the same rule as origin `TodoistAPI._update_state`.
+    deleted = data.get("is_deleted", 0)
+    return not (deleted == 0 or deleted is False)
+
+
+def index_values(data, field):
+    """
+    The values an object is indexed with for `field`: each label of a list
+    of labels, and the day (`YYYY-MM-DD`) of a due date.
+    """
+    value = data.get(field)
+    if value is None:
+        return ()
+    if field == "due":
+        date = value.get("date") if isinstance(value, dict) else value
+        return (date[:10], ) if date else ()
+    if isinstance(value, list):
+        return tuple(value)
+    return (value, )
+
+
+class StateIndex:
+    """
+    Lookup tables for the models of one resource type, keyed by primary key,
+    by temporary id and by the values of `INDEXED_FIELDS` (plus the
+    `TYPE_FIELDS` of the type).  The values of `RANGE_FIELDS` are also
+    kept sorted.
+
+    The values an object was indexed with are remembered, so that `reindex`
+    works even after the model's data has been changed in place.
+    """
+
+    __slots__ = ("dtype", "fields", "watched", "_objects", "_temp_ids", "_by_field",
+                 "_sorted", "_entries")
+
+    def __init__(self, dtype, fields=None):
+        self.dtype = dtype
+        self.fields = fields or INDEXED_FIELDS + TYPE_FIELDS.get(dtype, ())
+        #: the fields whose changes move an object in the index.
+        self.watched = frozenset(self.fields + ("id", "user_id"))
+        self._objects = {}
+        self._temp_ids = {}
+        self._by_field = {field: {} for field in self.fields}
+        self._sorted = {field: [] for field in self.fields if field in RANGE_FIELDS}
+        self._entries = {}
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __repr__(self):
+        return f"{__class__.__name__}({self.dtype!r}, size={len(self)})"
+
+    def add(self, obj):
+        try:
+            key = object_key(self.dtype, obj)
+        except KeyError:
+            key = None
+        temp_id = getattr(obj, "temp_id", "")
+        values = tuple(index_values(obj.data, field) for field in self.fields)
+        oid = id(obj)  # one int object shared by every table.
+        self._entries[oid] = key, temp_id, values
+
+        if key is not None:
+            self._objects[key] = obj
+        if temp_id:
+            self._temp_ids[temp_id] = obj
+        for field, field_values in zip(self.fields, values):
+            table = self._by_field[field]
+            for value in field_values:
+                bucket = table.get(value)
+                if bucket is None:
+                    bucket = table[value] = {}
+                    if field in self._sorted:
+                        insort(self._sorted[field], value)
+                bucket[oid] = obj
+
+    def discard(self, obj):
+        entry = self._entries.pop(id(obj), None)
+        if entry is None:
+            return
+        key, temp_id, values = entry
+        if self._objects.get(key) is obj:
+            del self._objects[key]
+        if self._temp_ids.get(temp_id) is obj:
+            del self._temp_ids[temp_id]
+        for field, field_values in zip(self.fields, values):
+            table = self._by_field[field]
+            for value in field_values:
+                bucket = table.get(value)
+                if bucket is None:
+                    continue
+                bucket.pop(id(obj), None)
+                if not bucket:
+                    del table[value]
+                    if field in self._sorted:
+                        keys = self._sorted[field]
+                        del keys[bisect_left(keys, value)]
+
+    def reindex(self, obj):
+        self.discard(obj)
+        self.add(obj)
+
+    def clear(self):
+        self._objects.clear()
+        self._temp_ids.clear()
+        self._entries.clear()
+        for table in self._by_field.values():
+            table.clear()
+        for keys in self._sorted.values():
+            keys.clear()
+
+    def get(self, key):
+        """Returns the model with primary key (or temporary id) `key`."""
+        obj = self._objects.get(key)
+        if obj is None:
+            obj = self._temp_ids.get(str(key))
+        return obj
+
+    def get_temp(self, temp_id):
+        return self._temp_ids.get(temp_id)
+
+    def match(self, data):
+        """Returns the local model for the raw object `data`, if any."""
+        return self.get(object_key(self.dtype, data))
+
+    def lookup(self, field, value):
+        """Returns the models whose `field` was indexed as `value`."""
+        return list(self._by_field[field].get(value, {}).values())
+
+    def bucket(self, field, value):
+        """The models whose `field` was indexed as `value`, by `id()`."""
+        return self._by_field[field].get(value, {})
+
+    def lookup_range(self, field, start=None, stop=None):
+        """
+        Returns the models, by `id()`, whose `field` (one of `RANGE_FIELDS`)
+        was indexed with a value from `start` up to, but not including,
+        `stop`.
+        """
+        keys, table = self._sorted[field], self._by_field[field]
+        lo = 0 if start is None else bisect_left(keys, start)
+        hi = len(keys) if stop is None else bisect_left(keys, stop)
+        found = {}
+        for value in keys[lo:hi]:
+            found.update(table[value])
+        return found
+
+
+class WatchedData(dict):
+    """
+    The `data` of a model of a `StateList`, which reindexes the model when
+    one of its indexed fields is changed in place, e.g. by `Item.move()`.
+    """
+
+    __slots__ = ("model", "index")
+
+    def __init__(self, data, model, index):
+        super().__init__(data)
+        self.model = model
+        self.index = index
+
+    def __reduce__(self):
+        return dict, (dict(self), )
+
+    def _changed(self, keys):
+        index = self.index
+        if index is not None and not index.watched.isdisjoint(keys):
+            index.reindex(self.model)
+
+    def __setitem__(self, key, value):
+        super().__setitem__(key, value)
+        self._changed((key, ))
+
+    def __delitem__(self, key):
+        super().__delitem__(key)
+        self._changed((key, ))
+
+    def update(self, *args, **kwargs):
+        changes = dict(*args, **kwargs)
+        super().update(changes)
+        self._changed(changes)
+
+    def setdefault(self, key, default=None):
+        if key in self:
+            return self[key]
+        self[key] = default
+        return default
+
+    def pop(self, key, *default):
+        found = key in self
+        value = super().pop(key, *default)
+        if found:
+            self._changed((key, ))
+        return value
+
+    def popitem(self):
+        item = super().popitem()
+        self._changed((item[0], ))
+        return item
+
+    def clear(self):
+        keys = list(self)
+        super().clear()
+        self._changed(keys)
+
+
+def watch_data(obj, index):
+    """Makes the in place changes of the data of `obj` reindex it in `index`."""
+    data = obj.data
+    if isinstance(data, WatchedData):
+        data.model, data.index = obj, index
+    elif type(data) is dict:
+        obj.data = WatchedData(data, obj, index)
+    elif hasattr(obj, "watch"):  # e.g. a compact model, see `compact.py`.
+        obj.watch(index)
+
+
+class StateList(list):
+    """
+    The list of models stored in `api.state[dtype]`, which keeps its
+    `index` up to date on every mutation made through the list interface,
+    and calls `on_change(obj, present)` with every model added or removed.
+    """
+
+    __slots__ = ("index", "on_change")
+
+    def __init__(self, dtype, iterable=(), on_change=None):
+        super().__init__()
+        self.index = StateIndex(dtype)
+        self.on_change = on_change
+        self.extend(iterable)
+
+    def __reduce__(self):
+        # a plain list, which the api indexes again once it is used.
+        return list, (list(self), )
+
+    def _add(self, obj):
+        self.index.add(obj)
+        watch_data(obj, self.index)
+        if self.on_change is not None:
+            self.on_change(obj, True)
+
+    def _discard(self, obj):
+        self.index.discard(obj)
+        watch_data(obj, None)
+        if self.on_change is not None:
+            self.on_change(obj, False)
+
+    def append(self, obj):
+        super().append(obj)
+        self._add(obj)
+
+    def extend(self, objs):
+        objs = list(objs)
+        super().extend(objs)
+        for obj in objs:
+            self._add(obj)
+
+    def __iadd__(self, objs):
+        self.extend(objs)
+        return self
+
+    def insert(self, i, obj):
+        super().insert(i, obj)
+        self._add(obj)
+
+    def remove(self, obj):
+        super().remove(obj)
+        self._discard(obj)
+
+    def pop(self, i=-1):
+        obj = super().pop(i)
+        self._discard(obj)
+        return obj
+
+    def clear(self):
+        olds = self[:]
+        super().clear()
+        self.index.clear()
+        for obj in olds:
+            watch_data(obj, None)
+            if self.on_change is not None:
+                self.on_change(obj, False)
+
+    def __setitem__(self, i, value):
+        if isinstance(i, slice):
+            olds, news = self[i], list(value)
+        else:
+            olds, news = [self[i]], [value]
+        super().__setitem__(i, news if isinstance(i, slice) else value)
+        for obj in olds:
+            self._discard(obj)
+        for obj in news:
+            self._add(obj)
+
+    def __delitem__(self, i):
+        olds = self[i] if isinstance(i, slice) else [self[i]]
+        super().__delitem__(i)
+        for obj in olds:
+            self._discard(obj)
+
+    def discard_many(self, objs):
+        """Removes all of `objs` in a single pass over the list."""
+        gone = {id(obj) for obj in objs}
+        for obj in objs:
+            self._discard(obj)
+        list.__setitem__(self, slice(None), [o for o in self if id(o) not in gone])
@@ -0,0 +1,99 @@
+import json
+import codecs
+
+from .state import model_cls
+
+_decoder = json.JSONDecoder()
+_WHITESPACE = " \t\n\r"
+
+
+class _Buffer:
+    """The text read so far from a byte stream, consumed from `pos`."""
+
+    __slots__ = ("stream", "chunk_size", "text", "pos", "eof", "_decode")
+
+    def __init__(self, stream, chunk_size):
+        self.stream = stream
+        self.chunk_size = chunk_size
+        self.text = ""
+        self.pos = 0
+        self.eof = False
+        self._decode = codecs.getincrementaldecoder("utf-8")().decode
+
+    async def fill(self, size=0):
+        """Reads at least one more chunk, or `size` more characters."""
+        if self.eof:
+            raise ValueError("unexpected end of the json stream")
+        # drop what was consumed, so only the current value is held.
+        self.text, self.pos = self.text[self.pos:], 0
+        target = len(self.text) + max(size, 1)
+        while len(self.text) < target:
+            chunk = await self.stream.read(self.chunk_size)
+            self.eof = not chunk
+            self.text += self._decode(chunk, final=self.eof)
+            if self.eof:
+                break
+
+    async def peek(self):
+        """Skips whitespaces and returns the next character."""
+        while True:
+            while self.pos < len(self.text) and self.text[self.pos] in _WHITESPACE:
+                self.pos += 1
+            if self.pos < len(self.text):
+                return self.text[self.pos]
+            await self.fill()
+
+    async def expect(self, char):
+        if await self.peek() != char:
+            raise ValueError(f"expected {char!r} at the json stream")
+        self.pos += 1
+
+    async def value(self):
+        await self.peek()
+        while True:
+            try:
+                value, end = _decoder.raw_decode(self.text, self.pos)
+            except ValueError:
+                if self.eof:
+                    raise
+                await self.fill(len(self.text) - self.pos)
+                continue
+            if end == len(self.text) and not self.eof:
+                # a number (or literal) may go on in the next chunk.
+                await self.fill()
+                continue
+            self.pos = end
+            return value
+
+
+async def iter_sync_response(stream, chunk_size=2 ** 16):
+    """
+    Parses a sync response incrementally from `stream` (anything with an
+    `async read(n)`, e.g. `aiohttp.ClientResponse.content`), and yields
+    its members as `(key, value)`.  The lists of the resource types in
+    `model_cls` are not built: each of their objects is yielded as
+    `(dtype, obj)` as soon as it was read.
+    """
+    buf = _Buffer(stream, chunk_size)
+    await buf.expect("{")
+    if await buf.peek() == "}":
+        return
+    while True:
+        key = await buf.value()
+        await buf.expect(":")
+        if key in model_cls and await buf.peek() == "[":
+            buf.pos += 1
+            if await buf.peek() != "]":
+                while True:
+                    yield key, await buf.value()
+                    if await buf.peek() != ",":
+                        break
+                    buf.pos += 1
+            await buf.expect("]")
+        else:
+            yield key, await buf.value()
+
+        if await buf.peek() != ",":
+            break
+        buf.pos += 1
+    await buf.expect("}")
@@ -1,32 +1,72 @@
 import sys
 import asyncio
-from copy import copy
-from json import dumps
+from time import monotonic
 from traceback import print_exc
 from argparse import ArgumentParser
 
 from todoist import models
 from todoist.api import json_default as _json_default
 from aiotodoist import AsyncTodoistAPI
+from aiotodoist.dispatch import Dispatcher
+from aiotodoist.events import field_changes
+from aiotodoist.state import model_cls, is_deleted
 
-model_cls = {
-    "collaborators": models.Collaborator,
-    "collaborator_states": models.CollaboratorState,
-    "filters": models.Filter,
-    "items": models.Item,
-    "labels": models.Label,
-    "live_notifications": models.LiveNotification,
-    "notes": models.Note,
-    "project_notes": models.ProjectNote,
-    "projects": models.Project,
-    "reminders": models.Reminder,
-    "sections": models.Section,
-}
+
+class ModelView:
+    """
+    An object of a sync response, as passed to the handlers.  It reads the
+    response dict in place (a copy of it for new objects, whose dict
+    becomes the data of their model in the state), and the model (`models.Item`, ...) is only
+    built when one of its methods or attributes is used.
+
+    The views of updated objects have the fields which changed as their
+    `changes`, `{field: (old, new)}`, and the others have `None`.
+    """
+
+    __slots__ = ("dtype", "data", "api", "changes", "_model")
+
+    def __init__(self, dtype, data, api, changes=None):
+        self.dtype = dtype
+        self.data = data
+        self.api = api
+        self.changes = changes
+        self._model = None
+
+    def __repr__(self):
+        return f"{model_cls[self.dtype].__name__}View({self.data!r})"
+
+    def __reduce__(self):
+        return type(self), (self.dtype, self.data, None, self.changes)
+
+    @property
+    def model(self):
+        if self._model is None:
+            self._model = model_cls[self.dtype](self.data, self.api)
+        return self._model
+
+    def __getattr__(self, name):
+        return getattr(self.model, name)
+
+    def __getitem__(self, key):
+        return self.data[key]
+
+    def __setitem__(self, key, value):
+        self.data[key] = value
+
+    def __contains__(self, key):
+        return key in self.data
+
+    def get(self, key, default=None):
+        return self.data.get(key, default)
 
 
 def json_default(obj):
+    if isinstance(obj, ModelView):
+        return {model_cls[obj.dtype].__name__: obj.data}
     if isinstance(obj, models.Model):
-        return {type(obj).__name__: dict(obj.data)}
+        data = obj.data
+        # the data of a compact model is a view.
+        return {type(obj).__name__: data if isinstance(data, dict) else dict(data)}
     return _json_default(obj)
 
 
@@ -62,44 +102,98 @@ class Cli(Handler):
 
     def on_data(self, news, updates, deletes, others):
 
-        print(dumps([news, updates, deletes, others],
-                    indent=self.indent, separators=",:", default=json_default))
+        print(self.api.codec.dumps([news, updates, deletes, others],
+                                   default=json_default, indent=self.indent))
+
+
+class AdaptiveInterval:
+    """
+    The interval to the next poll of an account: back to `minimum` after a
+    poll which saw changes, and `factor` times longer after an idle one,
+    up to `maximum`.
+    """
+
+    __slots__ = ("minimum", "maximum", "factor", "current")
+
+    def __init__(self, minimum=5, maximum=300, factor=2):
+        self.minimum = minimum
+        self.maximum = maximum
+        self.factor = factor
+        self.current = minimum
+
+    def __repr__(self):
+        return (f"{__class__.__name__}({self.minimum}, {self.maximum},"
+                f" factor={self.factor}, current={self.current})")
+
+    def update(self, changes):
+        if changes:
+            self.current = self.minimum
+        else:
+            self.current = min(self.maximum, self.current * self.factor)
+        return self.current
+
+    def reset(self):
+        self.current = self.minimum
+
+
+def _changes(ticks):
+    return sum(len(objs) for infos in ticks for kind in infos[:3]
+               for objs in kind.values())
 
 
-def _process_data(api, data):
+#: the resource type of a sync request which returns a `model_cls` type.
+_request_types = {"project_notes": "notes", "collaborator_states": "collaborators"}
+
+
+def _dtypes(resource_types=None):
+    """Returns the types of `model_cls` a sync of `resource_types` returns."""
+    if not resource_types:
+        return tuple(model_cls)
+    types = set(resource_types)
+    return tuple(dtype for dtype in model_cls
+                 if ("all" in types or _request_types.get(dtype, dtype) in types)
+                 and "-" + _request_types.get(dtype, dtype) not in types)
+
+
+def _process_data(api, data, dtypes=tuple(model_cls), predicate=None):
+    # `predicate(dtype, rdata)` skips objects before anything is built for them.
     news, updates, deletes = {}, {}, {}
-    for dtype, m_cls in model_cls.items():
-        for rdata in data.get(dtype, []):
+    for dtype in dtypes:
+        for rdata in data.get(dtype, ()):
+            if predicate is not None and not predicate(dtype, rdata):
+                continue
             local_obj = api._find_object(dtype, rdata)
             if local_obj:
-                if rdata.get("is_deleted"):
-                    deletes.setdefault(dtype, []).append(m_cls(rdata, api))
+                if is_deleted(rdata):
+                    deletes.setdefault(dtype, []).append(ModelView(dtype, rdata, api))
                 else:
-                    updates.setdefault(dtype, []).append(m_cls(rdata, api))
+                    changes = field_changes(local_obj.data, rdata)
+                    updates.setdefault(dtype, []).append(ModelView(dtype, rdata, api, changes))
             else:
-                if not rdata.get("is_deleted"):
-                    news.setdefault(dtype, []).append(m_cls(rdata, api))
-    others = {k: copy(v) for k, v in data.items() if k not in model_cls.keys()}
+                if not is_deleted(rdata):
+                    # the response dict of a new object becomes the data of
+                    # its model in the state, which later merges change.
+                    news.setdefault(dtype, []).append(ModelView(dtype, dict(rdata), api))
+    # the other objects of the response are not changed by merging it.
+    others = {k: v for k, v in data.items() if k not in model_cls}
     return news, updates, deletes, others
 
 
-async def subscribe(api, handler, error_handler, delay=5, relax=1):
-    while True:
-        data = dict()
-        try:
-            fut = api.sync()
-            cb, ctx = fut._callbacks[0]
-            fut.remove_done_callback(cb)
-
-            data = await fut
-            if data:
-                infos = _process_data(api, data)
+def _collect(api, ticks, error_handler, resource_types=None, predicate=None):
+    dtypes = _dtypes(resource_types)
 
-            fut._loop.call_soon(cb, fut, context=ctx)
+    def hook(data):
+        # the response is merged after the hooks: never keep it from that.
+        try:
+            ticks.append(_process_data(api, data, dtypes, predicate))
         except Exception as e:
             error_handler(e)
-            await asyncio.sleep(relax)
-            continue
+    return hook
+
+
+async def _dispatch(handler, error_handler, ticks):
+    while ticks:
+        infos = ticks.pop(0)
         try:
             coro = handler(*infos)
             if asyncio.iscoroutine(coro):
@@ -107,21 +201,77 @@ async def subscribe(api, handler, error_handler, delay=5, relax=1):
         except Exception as e:
             error_handler(e)
 
-        await asyncio.sleep(delay)
 
+async def _sleep(wake, delay):
+    """Sleeps `delay` seconds, returns True if `wake` was set meanwhile."""
+    try:
+        await asyncio.wait_for(wake.wait(), delay)
+    except asyncio.TimeoutError:
+        return False
+    return True
 
-async def main(args):
-    api = AsyncTodoistAPI(args.token, cache=args.cache)
-    hdlr = Cli(api)
-    hdlr.indent = args.indent if args.indent > 0 else None
 
+async def subscribe(api, handler, error_handler, delay=5, relax=1,
+                    resource_types=None, predicate=None,
+                    workers=0, max_lag=100, executor=None,
+                    max_delay=None, factor=2):
+    # every sync response of `api` is processed before it is merged into
+    # the state, including the ones of `commit()`s made meanwhile, which
+    # also end the sleep; a woken loop still syncs once the longest delay
+    # passed since the last sync.
+    ticks, wake = [], asyncio.Event()
+    collect = _collect(api, ticks, error_handler, resource_types, predicate)
+
+    def hook(data):
+        collect(data)
+        wake.set()
+
+    api.response_hooks.append(hook)
+    interval = AdaptiveInterval(delay, max_delay or delay, factor)
+    dispatcher = None
+    if workers:
+        dispatcher = Dispatcher(handler, error_handler, workers, max_lag, executor)
     try:
+        woken, synced = False, None
+        while True:
+            if not woken or monotonic() - synced >= interval.maximum:
+                try:
+                    await api.sync(resource_types=resource_types)
+                except Exception as e:
+                    error_handler(e)
+                    await asyncio.sleep(relax)
+                    continue
+                synced = monotonic()
+
+            changes = _changes(ticks)
+            if dispatcher is None:
+                await _dispatch(handler, error_handler, ticks)
+            else:
+                while ticks:
+                    await dispatcher.put(ticks.pop(0))
+
+            wake.clear()
+            woken = await _sleep(wake, interval.update(changes))
+    finally:
+        api.response_hooks.remove(hook)
+        if dispatcher is not None:
+            # the state has these changes already: handle them before leaving.
+            try:
+                await dispatcher.join()
+            finally:
+                dispatcher.close()
+
+
+async def main(args):
+    async with AsyncTodoistAPI(args.token, cache=args.cache) as api:
+        hdlr = Cli(api)
+        hdlr.indent = args.indent if args.indent > 0 else None
+
         if not api.sync_token:
             # first time, pull all states.
-            await api.sync()
-        await subscribe(api, hdlr.on_data, hdlr.on_error, args.delay, args.relax)
-    finally:
-        await api.session.close()
+            await api.sync(resource_types=args.types)
+        await subscribe(api, hdlr.on_data, hdlr.on_error, args.delay, args.relax,
+                        resource_types=args.types)
 
 
 if __name__ == '__main__':
@@ -136,6 +286,10 @@ if __name__ == '__main__':
     arg.add_argument("-i", "--idle", default=1, type=int, dest="relax",
                      help=r"The frequency to do nothing when error occurred."
                           r"  Default: 1 (seconds)")
+    arg.add_argument("-r", "--types", nargs="+", default=None, dest="types",
+                     metavar="TYPE",
+                     help=r"The resource types to sync, e.g. `items projects`."
+                          r"  Default: all")
     arg.add_argument("-s", "--spaces", default=2, type=int, dest="indent",
                      help=r"The spaces for json.dumps, set 0 to compact output."
                           r"  Default: 2")
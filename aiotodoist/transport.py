@@ -0,0 +1,195 @@
+from time import monotonic
+from random import uniform
+from inspect import isawaitable
+from contextlib import asynccontextmanager
+from asyncio import sleep, Semaphore, TimeoutError
+
+from aiohttp import ClientConnectionError, ClientSession, ClientTimeout, TCPConnector
+
+
+class TokenBucket:
+    """
+    Allows `rate` requests per second on average, and bursts of up to
+    `burst` requests.  `pause` holds every caller back, e.g. after the
+    server asked us to retry later.
+    """
+
+    __slots__ = ("rate", "burst", "_tokens", "_stamp", "_paused_until")
+
+    def __init__(self, rate, burst=None):
+        self.rate = rate
+        self.burst = burst or max(1, rate)
+        self._tokens = self.burst
+        self._stamp = monotonic()
+        self._paused_until = 0
+
+    def __repr__(self):
+        return f"{__class__.__name__}(rate={self.rate}, burst={self.burst})"
+
+    def pause(self, seconds):
+        self._paused_until = max(self._paused_until, monotonic() + seconds)
+
+    async def acquire(self):
+        while True:
+            now = monotonic()
+            if now < self._paused_until:
+                await sleep(self._paused_until - now)
+                continue
+
+            self._tokens = min(self.burst, self._tokens + (now - self._stamp) * self.rate)
+            self._stamp = now
+            if self._tokens >= 1:
+                self._tokens -= 1
+                return
+            await sleep((1 - self._tokens) / self.rate)
+
+
+class Transport:
+    """
+    Sends the requests of `AsyncTodoistAPI` and its managers.
+
+    A response with one of `retry_statuses`, a connection error or a
+    timeout is retried up to `retries` times, after the `Retry-After`
+    the server asked for or else an exponential backoff with full jitter
+    (`backoff` * 2 ** attempt, capped at `max_backoff`).  Optionally,
+    requests are throttled to `rate` per second and to `concurrency`
+    requests in flight, until their body was read.  Share one instance between apis to share these
+    limits.
+    """
+
+    retry_statuses = frozenset((429, 500, 502, 503, 504))
+
+    def __init__(self, retries=3, backoff=0.5, max_backoff=30,
+                 rate=None, burst=None, concurrency=None):
+        self.retries = retries
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.bucket = TokenBucket(rate, burst) if rate else None
+        self.concurrency = concurrency
+        self._sem = None
+
+    def __repr__(self):
+        return (f"{__class__.__name__}(retries={self.retries}, bucket={self.bucket},"
+                f" concurrency={self.concurrency})")
+
+    def _delay(self, attempt, resp=None):
+        retry_after = resp.headers.get("Retry-After") if resp is not None else None
+        if retry_after is not None:
+            try:
+                return float(retry_after)
+            except ValueError:
+                pass
+        return uniform(0, min(self.max_backoff, self.backoff * 2 ** attempt))
+
+    async def request(self, session, method, url, **kwargs):
+        """
+        Returns the response of `session.<method>(url, **kwargs)`, with its
+        body read.
+        """
+        resp = await self._send(session, method, url, **kwargs)
+        try:
+            await resp.read()
+        finally:
+            self._release()
+        return resp
+
+    @asynccontextmanager
+    async def stream(self, session, method, url, **kwargs):
+        """
+        `async with transport.stream(...) as resp:` reads the body of the
+        response as it comes, and holds its request slot until then.
+        """
+        resp = await self._send(session, method, url, **kwargs)
+        try:
+            async with resp:
+                yield resp
+        finally:
+            self._release()
+
+    def _release(self):
+        if self._sem is not None:
+            self._sem.release()
+
+    async def _send(self, session, method, url, **kwargs):
+        # returns holding a request slot, see `_release`.
+        if self.concurrency and self._sem is None:
+            self._sem = Semaphore(self.concurrency)
+
+        attempt = 0
+        while True:
+            if self.bucket is not None:
+                await self.bucket.acquire()
+            if self._sem is not None:
+                await self._sem.acquire()
+            try:
+                resp = await getattr(session, method)(url, **kwargs)
+            except (ClientConnectionError, TimeoutError):
+                self._release()
+                if attempt >= self.retries:
+                    raise
+                await sleep(self._delay(attempt))
+            except BaseException:
+                self._release()
+                raise
+            else:
+                if resp.status not in self.retry_statuses or attempt >= self.retries:
+                    return resp
+                self._release()
+                delay = self._delay(attempt, resp)
+                resp.release()
+                if resp.status == 429 and self.bucket is not None:
+                    self.bucket.pause(delay)
+                await sleep(delay)
+            attempt += 1
+
+
+class ConnectionPool:
+    """
+    A tuned `TCPConnector` for the sessions of `AsyncTodoistAPI`.  Pass one
+    pool to many apis (`AsyncTodoistAPI(pool=...)`) to share their
+    keep-alive connections instead of opening a TLS connection per user.
+
+    `limit` and `limit_per_host` bound the open connections (0 for no
+    limit), idle ones are kept for `keepalive_timeout` seconds and DNS
+    answers for `ttl_dns_cache` seconds.  `timeout` and `connect_timeout`
+    apply to each request of the sessions made by `session()`.
+    """
+
+    def __init__(self, limit=100, limit_per_host=0, keepalive_timeout=30,
+                 ttl_dns_cache=300, timeout=60, connect_timeout=None):
+        self.limit = limit
+        self.limit_per_host = limit_per_host
+        self.keepalive_timeout = keepalive_timeout
+        self.ttl_dns_cache = ttl_dns_cache
+        self.timeout = ClientTimeout(total=timeout, connect=connect_timeout)
+        self._connector = None
+
+    def __repr__(self):
+        return (f"{__class__.__name__}(limit={self.limit},"
+                f" limit_per_host={self.limit_per_host})")
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self.close()
+
+    @property
+    def connector(self):
+        if self._connector is None or self._connector.closed:
+            self._connector = TCPConnector(limit=self.limit,
+                                           limit_per_host=self.limit_per_host,
+                                           keepalive_timeout=self.keepalive_timeout,
+                                           ttl_dns_cache=self.ttl_dns_cache)
+        return self._connector
+
+    def session(self, **kwargs):
+        """Returns a new session on this pool, which does not own the pool."""
+        kwargs.setdefault("timeout", self.timeout)
+        return ClientSession(connector=self.connector, connector_owner=False, **kwargs)
+
+    async def close(self):
+        if self._connector is not None:
+            closing = self._connector.close()
+            if isawaitable(closing):  # a coroutine since aiohttp 3.8
+                await closing
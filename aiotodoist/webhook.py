@@ -0,0 +1,102 @@
+import hmac
+import base64
+from hashlib import sha256
+
+from aiohttp import web
+
+from .subscribe import subscribe
+
+#: the resource type of the objects of a webhook event, by its prefix.
+EVENT_TYPES = {
+    "item": "items",
+    "note": "notes",
+    "project": "projects",
+    "section": "sections",
+    "label": "labels",
+    "filter": "filters",
+}
+
+
+def event_delta(event):
+    """
+    Turns a webhook `event` into a sync delta of its object, or returns
+    `None` for the events which do not change the state.
+    """
+    kind, _, action = event.get("event_name", "").partition(":")
+    dtype = EVENT_TYPES.get(kind)
+    data = event.get("event_data")
+    if dtype is None or not isinstance(data, dict):
+        return None
+    if dtype == "notes" and not data.get("item_id"):
+        dtype = "project_notes"
+    if action == "deleted":
+        data = dict(data, is_deleted=1)
+    return {dtype: [data]}
+
+
+class WebhookReceiver:
+    """
+    Receives the webhook events of the Todoist app of `client_secret` at
+    `path`, and merges them into the state of `api` as the sync responses
+    are, so `subscribe()` gets them without polling.
+
+    Requests without a valid `X-Todoist-Hmac-SHA256` signature are
+    answered with 403, and events of other users are ignored.  Until the
+    user of `api` is known (i.e. before its first sync), events are
+    answered with 503, for Todoist to send them again later.
+    """
+
+    def __init__(self, api, client_secret, path="/webhook"):
+        self.api = api
+        if isinstance(client_secret, str):
+            client_secret = client_secret.encode()
+        self.client_secret = client_secret
+        self.path = path
+
+    def __repr__(self):
+        return f"{__class__.__name__}({self.api}, path={self.path!r})"
+
+    def add_routes(self, app):
+        app.router.add_post(self.path, self.handle)
+
+    def verify(self, body, signature):
+        digest = hmac.new(self.client_secret, body, sha256).digest()
+        return hmac.compare_digest(base64.b64encode(digest), (signature or "").encode())
+
+    async def handle(self, request):
+        body = await request.read()
+        if not self.verify(body, request.headers.get("X-Todoist-Hmac-SHA256")):
+            raise web.HTTPForbidden()
+        try:
+            event = self.api.codec.loads(body)
+        except ValueError:
+            raise web.HTTPBadRequest()
+
+        user = self.api.state.get("user") or {}
+        if not user.get("id"):
+            raise web.HTTPServiceUnavailable()
+        if str(event.get("user_id")) != str(user["id"]):
+            return web.Response()
+        delta = event_delta(event)
+        if delta is not None:
+            self.api._merge_response(delta)
+        return web.Response()
+
+
+async def serve_webhooks(api, handler, error_handler, client_secret,
+                         host="0.0.0.0", port=8080, path="/webhook",
+                         reconcile=300, **subscribe_kwargs):
+    """
+    Serves a `WebhookReceiver` for `api` and `subscribe()`s to it, with a
+    sync every `reconcile` seconds to catch up on the events which were
+    missed.  The other keyword arguments are passed to `subscribe()`.
+    """
+    app = web.Application()
+    WebhookReceiver(api, client_secret, path).add_routes(app)
+    runner = web.AppRunner(app)
+    await runner.setup()
+    try:
+        await web.TCPSite(runner, host, port).start()
+        await subscribe(api, handler, error_handler, delay=reconcile, **subscribe_kwargs)
+    finally:
+        await runner.cleanup()
@@ -0,0 +1,55 @@
+"""
+Measures the memory held by `api.state` per item, with and without
+`AsyncTodoistAPI(compact=True)`:
+
+    PYTHONPATH=. python benchmarks/state_memory.py [count]
+"""
+import sys
+import gc
+import json
+import random
+import tracemalloc
+from unittest.mock import MagicMock
+
+from aiotodoist import AsyncTodoistAPI
+
+
+def make_items(count):
+    rnd = random.Random(0)
+    items = []
+    for i in range(count):
+        items.append(dict(
+            id=10 ** 9 + i, legacy_id=None, user_id=1, project_id=rnd.randrange(100),
+            legacy_project_id=None, content=f"task {i}",
+            due=dict(date=f"2020-{rnd.randrange(1, 13):02}-{rnd.randrange(1, 29):02}",
+                     timezone=None, string="every day", lang="en", is_recurring=False)
+            if rnd.random() < 0.5 else None,
+            priority=rnd.randrange(1, 5), parent_id=None, legacy_parent_id=None,
+            child_order=i, section_id=None, day_order=-1, collapsed=0,
+            labels=rnd.sample(range(20), 2), added_by_uid=1, assigned_by_uid=None,
+            responsible_uid=None, checked=0, in_history=0, is_deleted=0, sync_id=None,
+            date_completed=None, date_added="2020-01-01T00:00:00Z",
+        ))
+    # as decoded from a response, without sharing strings between objects.
+    return json.loads(json.dumps(items))
+
+
+def measure(count, compact):
+    gc.collect()
+    tracemalloc.start()
+    items = make_items(count)
+    api = AsyncTodoistAPI("DUMMY_TOKEN", session=MagicMock(), cache=None, compact=compact)
+    api._update_state(dict(items=items))
+    del items
+    gc.collect()
+    size, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return size / count
+
+
+if __name__ == "__main__":
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 50000
+    before = measure(count, compact=False)
+    after = measure(count, compact=True)
+    print(f"{count} items: {before:.0f} bytes per item, {after:.0f} compact"
+          f" ({after / before:.0%})")
@@ -1,3 +1,5 @@
+import json
+
 from aiohttp import web
 
 
@@ -18,6 +20,58 @@ def _return_text(string, **kwargs):
     return wrap
 
 
+def _return_object(name):
+    async def wrap(req):
+        obj_id = req.query[f"{name}_id"]
+        req.app["hits"][obj_id] = req.app["hits"].get(obj_id, 0) + 1
+        if obj_id == "0":
+            return web.json_response(dict(error="not found"))
+        return web.json_response({name: dict(id=int(obj_id), content=obj_id)})
+    return wrap
+
+
+def _return_flaky(status, fails, **headers):
+    async def wrap(req):
+        req.app["hits"][req.path] = req.app["hits"].get(req.path, 0) + 1
+        if req.app["hits"][req.path] <= fails:
+            return web.json_response(dict(error=status), status=status,
+                                     headers=headers)
+        return web.json_response({})
+    return wrap
+
+
+def _return_chunked(data, size):
+    async def wrap(req):
+        body = json.dumps(data, indent=1).encode()
+        resp = web.StreamResponse(headers={"Content-Type": "application/json"})
+        await resp.prepare(req)
+        for i in range(0, len(body), size):
+            await resp.write(body[i:i + size])
+        await resp.write_eof()
+        return resp
+    return wrap
+
+
+FULL_SYNC = dict(
+    sync_token="full", full_sync=True, day_orders={"1": 1},
+    items=[dict(id=i, content="\u00e9" * i, project_id=1) for i in range(1, 50)],
+    projects=[dict(id=1, name="inbox")], labels=[], user=dict(id=7),
+    live_notifications_last_read_id=12345,
+)
+
+
+def _return_archive(element_type, pages=3, size=2):
+    async def wrap(req):
+        uid = req.query.get("project_id")
+        page = int(req.query.get("cursor", 0))
+        key = f"archive:{uid}"
+        req.app["hits"][key] = req.app["hits"].get(key, 0) + 1
+        elements = [dict(id=f"{uid}.{page}.{n}") for n in range(size)]
+        return web.json_response({element_type: elements, "has_more": page + 1 < pages,
+                                  "next_cursor": str(page + 1)})
+    return wrap
+
+
 def create_app():
     app = web.Application()
     app.router.add_get("/get_null", _return_json({}))
@@ -27,4 +81,12 @@ def create_app():
     app.router.add_post("/post_null_text", _return_text("", content_type="application/json"))
     app.router.add_post("/sync", _return_json({}))
 
+    app["hits"] = {}
+    app.router.add_get("/items/get", _return_object("item"))
+    app.router.add_get("/labels/get", _return_object("label"))
+    app.router.add_get("/throttled", _return_flaky(429, 2, **{"Retry-After": "0"}))
+    app.router.add_post("/unavailable", _return_flaky(503, 5))
+    app.router.add_get("/sync/v8/archive/items", _return_archive("items"))
+    app.router.add_post("/stream/sync", _return_chunked(FULL_SYNC, 7))
+
     return app
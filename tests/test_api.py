@@ -1,10 +1,12 @@
-from asyncio import isfuture, iscoroutine, ensure_future, sleep, CancelledError
+import threading
+from asyncio import (isfuture, iscoroutine, ensure_future, sleep, wait_for, CancelledError,
+                     get_running_loop)
 from unittest.mock import patch, MagicMock
 
 from aiohttp.test_utils import AioHTTPTestCase, unittest_run_loop
 
 import aiotodoist
-from tests.stubs import create_app
+from tests.stubs import create_app, FULL_SYNC
 
 try:
     from unittest.mock import AsyncMock  # type: ignore[attr-defined]
@@ -108,6 +110,26 @@ class TestAsyncTodoistAPI(AioHTTPTestCase):
             self.assertEqual(resp, dummy_in)
             m.items.assert_called()
 
+    def test_sync_resource_types(self):
+        posts = []
+
+        def _post(call, data):
+            posts.append(data["sync_token"])
+            return dict(sync_token=str(len(posts)), items=[dict(id=len(posts))])
+
+        self.api.sync_token = "0"
+        with patch.object(self.api, "_post", side_effect=_post):
+            resp = self.api.sync(resource_types=["items"])
+            self.assertEqual(resp["sync_token"], "1")
+            self.assertEqual(self.api.sync_token, "0")
+            self.assertEqual(self.api.sync_tokens, {("items", ): "1"})
+            self.api.sync()
+            self.api.sync(resource_types=["items"])
+            self.api.sync(resource_types=["all"])
+        self.assertEqual(posts, ["0", "0", "1", "2"])
+        self.assertEqual((self.api.sync_token, self.api.sync_tokens), ("4", {("items", ): "3"}))
+        self.assertEqual(len(self.api.state["items"]), 4)
+
     def test_sync_future_callback(self):
         with patch("aiotodoist.api.ensure_future") as ensure_future:
             resp = self.api.sync()
@@ -220,3 +242,239 @@ class TestAsyncTodoistAPI(AioHTTPTestCase):
             ret = await self.api.commit(raise_on_error=True)
             self.assertEqual(ret, rv)
             self.assertEqual(self.api.queue, [])
+
+    @unittest_run_loop
+    async def test_commit_chunks(self):
+        commands = [dict(type="item_add", temp_id="t1", args=dict(content="a")),
+                    dict(type="item_add", temp_id="t2", args=dict(parent_id="t1")),
+                    dict(type="item_update", args=dict(id="t2", content="c"))]
+        sent = []
+
+        def _helper(commands):
+            async def n():
+                sent.append(commands)
+                mapping = {c["temp_id"]: len(self.api.temp_ids) + 1
+                           for c in commands if "temp_id" in c}
+                self.api.temp_ids.update(mapping)
+                return dict(sync_status={c["type"] + str(len(sent)): "ok"
+                                         for c in commands},
+                            temp_id_mapping=mapping)
+            return ensure_future(n())
+
+        self.api.queue.extend(commands)
+        with patch.object(self.api, "sync", side_effect=_helper):
+            ret = await self.api.commit(max_commands=1)
+        self.assertEqual([len(c) for c in sent], [1, 1, 1])
+        self.assertEqual(sent[1][0]["args"], dict(parent_id=1))
+        self.assertEqual(sent[2][0]["args"], dict(id=2, content="c"))
+        self.assertEqual(ret["temp_id_mapping"], dict(t1=1, t2=2))
+        self.assertEqual(len(ret["sync_status"]), 3)
+        self.assertEqual(self.api.queue, [])
+
+        sent.clear()
+        self.api.queue.extend(commands)
+        with patch.object(self.api, "sync", side_effect=_helper):
+            await self.api.commit(max_bytes=120)
+        self.assertEqual([len(c) for c in sent], [2, 1])
+
+    @unittest_run_loop
+    async def test_commit_chunks_requeue(self):
+        commands = [dict(type="item_add", temp_id="t1", args={}),
+                    dict(type="item_update", args=dict(id="t1")),
+                    dict(type="item_delete", args=dict(id=5))]
+
+        def _helper(commands):
+            async def n():
+                if commands[0]["type"] == "item_add":
+                    self.api.temp_ids["t1"] = 1
+                    return dict(temp_id_mapping=dict(t1=1))
+                raise TimeoutError
+            return ensure_future(n())
+
+        self.api.queue.extend(commands)
+        with patch.object(self.api, "sync", side_effect=_helper), \
+                self.assertRaises(TimeoutError):
+            await self.api.commit(max_commands=1)
+        self.assertEqual(self.api.queue, [dict(type="item_update", args=dict(id=1)),
+                                          commands[2]])
+
+        self.api.temp_ids.clear()
+        self.api.queue[:] = commands
+        fut = self.api.commit(max_commands=2)
+        fut.cancel()
+        with self.assertRaises(CancelledError):
+            await fut
+        self.assertEqual(self.api.queue, commands)
+
+    @unittest_run_loop
+    async def test_autoflush(self):
+        sent = []
+
+        def _helper(commands):
+            async def n():
+                sent.append(commands)
+                return dict(sync_status={c["uuid"]: "ok" for c in commands})
+            return ensure_future(n())
+
+        self.api.state["user"]["inbox_project"] = 1
+        flusher = self.api.enable_autoflush(max_commands=3, delay=0.05)
+        with patch.object(self.api, "sync", side_effect=_helper):
+            futs = [flusher.submit(self.api.items.update, i, content="x")
+                    for i in range(4)]
+            self.assertEqual(await futs[0], "ok")
+            self.assertEqual(await futs[3], "ok")
+            self.assertEqual([len(c) for c in sent], [4])
+
+            fut = flusher.submit(self.api.items.update, 5, content="x")
+            await sleep(0.01)
+            self.assertFalse(fut.done())
+            self.assertEqual(await fut, "ok")
+            self.assertEqual([len(c) for c in sent], [4, 1])
+
+            self.api.items.add("implicit")
+            await flusher.flush()
+            self.assertEqual([len(c) for c in sent], [4, 1, 1])
+        self.assertEqual(self.api.queue, [])
+
+        self.api.disable_autoflush()
+        self.api.items.add("manual")
+        await sleep(0.1)
+        self.assertEqual(len(self.api.queue), 1)
+
+    @unittest_run_loop
+    async def test_autoflush_failure(self):
+        sent = []
+
+        def _helper(commands):
+            async def n():
+                sent.append([c["args"]["id"] for c in commands])
+                if len(sent) == 1:
+                    raise ValueError
+                return dict(sync_status={c["uuid"]: "ok" for c in commands})
+            return ensure_future(n())
+
+        flusher = self.api.enable_autoflush(delay=0.01)
+        with patch.object(self.api, "sync", side_effect=_helper):
+            with self.assertRaises(ValueError):
+                await flusher.submit(self.api.items.delete, 1)
+            self.assertEqual(self.api.queue, [])  # not sent again behind our back.
+            fut = flusher.submit(self.api.items.delete, 2)
+            self.assertEqual(await wait_for(fut, 1), "ok")
+        self.assertEqual(sent, [[1], [2]])
+
+    @unittest_run_loop
+    async def test_autoflush_close(self):
+        sent = []
+
+        def _helper(commands):
+            async def n():
+                sent.append(commands)
+                return dict(sync_status={c["uuid"]: "ok" for c in commands})
+            return ensure_future(n())
+
+        self.api.state["user"]["inbox_project"] = 1
+        flusher = self.api.enable_autoflush(delay=10)
+        with patch.object(self.api, "sync", side_effect=_helper):
+            fut = flusher.submit(self.api.items.update, 1, content="x")
+            await self.api.close()  # commits what is queued.
+        self.assertEqual(await fut, "ok")
+        self.assertEqual([len(c) for c in sent], [1])
+        self.assertIsNone(self.api.flusher)
+
+        flusher = self.api.enable_autoflush(delay=10)
+        fut = flusher.submit(self.api.items.update, 2, content="x")
+        self.api.disable_autoflush()
+        with self.assertRaises(CancelledError):
+            await fut
+        self.assertEqual(len(self.api.queue), 1)
+
+    @unittest_run_loop
+    async def test_sync_stream(self):
+        self.api.get_api_url = lambda: "/stream/"
+        seen = []
+        self.api.response_hooks.append(seen.append)
+        with patch.object(self.api, "_update_state",
+                          wraps=self.api._update_state) as m_update:
+            resp = await self.api._sync_stream({}, batch_size=20)
+
+        self.assertNotIn("items", resp)
+        self.assertEqual(resp["live_notifications_last_read_id"], 12345)
+        self.assertEqual(m_update.call_count, 4)  # 20 + 20 + 10 objects, then the others
+        self.assertEqual(seen[-1]["sync_token"], "full")
+        self.assertEqual(self.api.sync_token, "full")
+        self.assertEqual(len(self.api.state["items"]), 49)
+        self.assertEqual(self.api.items.get_by_id(3)["content"], "é" * 3)
+        self.assertEqual(self.api.state["user"], FULL_SYNC["user"])
+
+        fut = self.api.sync(stream=True)
+        self.assertTrue(isfuture(fut))
+        self.assertEqual(await fut, resp)
+
+    @unittest_run_loop
+    async def test_sync_merge_off_loop(self):
+        response = dict(sync_token="2", items=[dict(id=i) for i in range(1, 1001)],
+                        temp_id_mapping={})
+
+        async def _post(call, data):
+            return response
+
+        for merge in ("thread", "chunked"):
+            api = aiotodoist.AsyncTodoistAPI("DUMMY_TOKEN", session=self.client,
+                                             cache=None, merge=merge)
+            api.merge_chunk_size = 300
+            api._post = _post
+            threads, locked = [], []
+            api.response_hooks.append(lambda data: threads.append(threading.get_ident()))
+            changes = api.changes()
+
+            async def _read():
+                await sleep(0)
+                locked.append(api.state_lock.locked())
+                async with api.state_lock:
+                    return len(api.state["items"])
+
+            with patch.object(api, "_update_state", wraps=api._update_state) as m_update:
+                fut = api.sync()
+                seen = await _read()
+                self.assertIs(await fut, response)
+
+            self.assertEqual(seen, 1000)  # not a half-merged state.
+            self.assertEqual(locked, [True])
+            self.assertEqual(threads, [threading.get_ident()])
+            self.assertEqual(api.sync_token, "2")
+            self.assertEqual(len(changes), 1000)
+            if merge == "chunked":
+                self.assertEqual(m_update.call_count, 5)  # 4 chunks, then the others.
+
+    @unittest_run_loop
+    async def test_sync_merge_thread_serialized(self):
+        response = dict(sync_token="2", items=[dict(id=i, project_id=1) for i in range(1, 101)])
+        merging = threading.Event()
+
+        async def _post(call, data):
+            return response
+
+        api = aiotodoist.AsyncTodoistAPI("DUMMY_TOKEN", session=self.client,
+                                         cache=None, merge="thread")
+        api._post = _post
+        api.state["user"]["inbox_project"] = 1
+        apply_response = api._apply_response
+
+        def _slow_apply(resp):
+            with api.merge_mutex:
+                merging.set()
+                threading.Event().wait(0.05)
+                apply_response(resp)
+
+        with patch.object(api, "_apply_response", side_effect=_slow_apply):
+            fut = api.sync()
+            await get_running_loop().run_in_executor(None, merging.wait)
+            # changes made on the loop meanwhile wait for the merge.
+            api._update_state(dict(items=[dict(id=1000, project_id=1)]))
+            self.assertEqual(len(api.state["items"]), 101)
+            api.items.add("local", project_id=1)
+            await fut
+
+        self.assertEqual(len(api.state["items"]), 102)
+        self.assertEqual(len(api.select(project_id=1)), 102)
+        self.assertEqual(len(api.state["items"].index), 102)
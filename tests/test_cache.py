@@ -0,0 +1,109 @@
+import os
+from tempfile import TemporaryDirectory
+from unittest import TestCase
+from unittest.mock import MagicMock
+
+import aiotodoist
+from aiotodoist.cache import JournalCache
+
+
+class TestJournalCache(TestCase):
+
+    def setUp(self):
+        self.tmp = TemporaryDirectory()
+        self.path = self.tmp.name + "/"
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def make_api(self):
+        return aiotodoist.AsyncTodoistAPI("DUMMY_TOKEN",
+                                          session=MagicMock(),
+                                          cache=self.path)
+
+    def test_journal_roundtrip(self):
+        api = self.make_api()
+        self.assertIsInstance(api.cache, JournalCache)
+        for delta in (dict(sync_token="1", items=[dict(id=1, content="a"),
+                                                 dict(id=2, content="b")]),
+                      dict(sync_token="2", items=[dict(id=1, content="c")],
+                           user=dict(id=9)),
+                      dict(sync_token="3", items=[dict(id=2, is_deleted=1)]),
+                      dict()):
+            api._update_state(delta)
+            api._write_cache(delta)
+        api.cache.flush()
+
+        with open(self.path + "DUMMY_TOKEN.journal") as f:
+            self.assertEqual(len(f.readlines()), 3)
+
+        api2 = self.make_api()
+        self.assertEqual(api2.sync_token, "3")
+        self.assertEqual(api2.state["user"], dict(id=9))
+        self.assertEqual([o.data for o in api2.state["items"]],
+                         [dict(id=1, content="c")])
+
+    def test_compact(self):
+        api = self.make_api()
+        api.cache.compact_after = 2
+        for i in range(5):
+            delta = dict(sync_token=str(i), projects=[dict(id=i, name=str(i))])
+            api._update_state(delta)
+            api._write_cache(delta)
+        api.cache.flush()
+
+        self.assertTrue(os.path.exists(self.path + "DUMMY_TOKEN.json"))
+        with open(self.path + "DUMMY_TOKEN.journal") as f:
+            self.assertEqual(len(f.readlines()), 1)
+
+        api2 = self.make_api()
+        self.assertEqual(api2.sync_token, "4")
+        self.assertEqual(sorted(o["id"] for o in api2.state["projects"]),
+                         list(range(5)))
+
+
+class TestCacheBackends(TestCase):
+
+    deltas = (dict(sync_token="1", user=dict(id=9, name="a"),
+                   items=[dict(id=1, content="a"), dict(id=2, content="b")],
+                   collaborator_states=[dict(project_id=1, user_id=9)]),
+              dict(sync_token="2", user=dict(name="b"),
+                   items=[dict(id=1, content="c"), dict(id=2, is_deleted=1)]))
+
+    def roundtrip(self, cache):
+        api = aiotodoist.AsyncTodoistAPI("DUMMY_TOKEN", session=MagicMock(),
+                                         cache=cache)
+        self.assertIs(api.cache, cache)
+        for delta in self.deltas:
+            api._update_state(delta)
+            api._write_cache(delta)
+        cache.flush()
+
+        api2 = aiotodoist.AsyncTodoistAPI("DUMMY_TOKEN", session=MagicMock(),
+                                          cache=cache)
+        self.assertEqual(api2.sync_token, "2")
+        self.assertEqual(api2.state["user"], dict(id=9, name="b"))
+        self.assertEqual([o.data for o in api2.state["items"]],
+                         [dict(id=1, content="c")])
+        self.assertEqual(len(api2.state["collaborator_states"]), 1)
+
+        other = aiotodoist.AsyncTodoistAPI("OTHER_TOKEN", session=MagicMock(),
+                                           cache=cache)
+        self.assertEqual(other.sync_token, "*")
+        self.assertEqual(other.state["items"], [])
+
+    def test_memory(self):
+        self.roundtrip(aiotodoist.MemoryCache())
+
+    def test_sqlite(self):
+        with TemporaryDirectory() as tmp:
+            cache = aiotodoist.SQLiteCache(os.path.join(tmp, "state.db"))
+            self.roundtrip(cache)
+            cache.close()
+
+    def test_null(self):
+        cache = aiotodoist.NullCache()
+        api = aiotodoist.AsyncTodoistAPI("DUMMY_TOKEN", session=MagicMock(),
+                                         cache=cache)
+        api._write_cache(self.deltas[0])
+        self.assertEqual(cache.load("DUMMY_TOKEN"), [])
@@ -0,0 +1,37 @@
+from datetime import date, datetime
+from unittest import TestCase
+from unittest.mock import MagicMock
+
+from todoist.models import Item
+
+from aiotodoist import json_default
+from aiotodoist.codec import available, get_codec, JSONCodec
+
+
+class TestCodec(TestCase):
+
+    def test_codecs(self):
+        item = Item(dict(id=1, content="é"), MagicMock())
+        obj = {"when": datetime(2020, 1, 2, 3, 4, 5), "day": date(2020, 1, 2),
+               "day_orders": {1: 2}, "item": item}
+        expected = {"when": "2020-01-02T03:04:05", "day": "2020-01-02",
+                    "day_orders": {"1": 2}, "item": {"Item": {"id": 1, "content": "é"}}}
+
+        for name in available:
+            with self.subTest(codec=name):
+                codec = get_codec(name)
+                self.assertEqual(codec.name, name)
+                for indent in (None, 2, 4):
+                    s = codec.dumps(obj, default=json_default, indent=indent)
+                    self.assertIsInstance(s, str)
+                    self.assertEqual(codec.loads(s), expected)
+                    self.assertEqual(codec.loads(s.encode()), expected)
+                with self.assertRaises(ValueError):
+                    codec.loads("{")
+
+    def test_get_codec(self):
+        self.assertEqual(get_codec().name, available[0])
+        codec = JSONCodec()
+        self.assertIs(get_codec(codec), codec)
+        with self.assertRaises(ValueError):
+            get_codec("pickle")
@@ -0,0 +1,91 @@
+import json
+import pickle
+from unittest import TestCase
+from unittest.mock import MagicMock
+
+from todoist.models import Item, Collaborator
+
+import aiotodoist
+from aiotodoist.compact import CompactModel
+
+
+class TestCompactState(TestCase):
+
+    def setUp(self):
+        self.api = aiotodoist.AsyncTodoistAPI("DUMMY_TOKEN", session=MagicMock(),
+                                              cache=None, compact=True)
+        self.api._update_state(json.loads(json.dumps(dict(
+            items=[dict(id=i, content=f"task {i}", project_id=1, labels=[2],
+                        due=dict(date="2020-01-02"), custom=i) for i in range(3)],
+            collaborators=[dict(id=5)],
+        ))))
+
+    def test_model_interface(self):
+        item = self.api.items.get_by_id(1)
+        self.assertIsInstance(item, Item)
+        self.assertIsInstance(item, CompactModel)
+        self.assertIs(item.api, self.api)
+        self.assertFalse(hasattr(item, "__dict__") and item.__dict__)
+        self.assertIsInstance(self.api.collaborators.get_by_id(5), Collaborator)
+
+        self.assertEqual(item["content"], "task 1")
+        self.assertEqual(dict(item.data), dict(id=1, content="task 1", project_id=1, labels=[2],
+                                               due=dict(date="2020-01-02"), custom=1))
+        self.assertIn("custom", item)
+        self.assertNotIn("section_id", item)
+        self.assertIsNone(item.data.get("section_id"))
+        with self.assertRaises(KeyError):
+            item["section_id"]
+        self.assertTrue(repr(item).startswith("Item({"))
+
+        item.data.update(content="new", other=True)
+        del item.data["custom"]
+        self.assertEqual((item["content"], item["other"], "custom" in item.data),
+                         ("new", True, False))
+        self.assertEqual(len(item.data), 6)
+
+    def test_interned_strings(self):
+        first, second = self.api.items.get_by_id(0), self.api.items.get_by_id(1)
+        self.assertIs(first["due"]["date"], second["due"]["date"])
+
+        self.api._update_state(json.loads(json.dumps(dict(
+            items=[dict(id=i, content="same") for i in range(2)]))))
+        first, second = self.api.items.get_by_id(0), self.api.items.get_by_id(1)
+        self.assertEqual(first["content"], second["content"])
+        self.assertIsNot(first["content"], second["content"])  # not a repeated field.
+
+    def test_state_features(self):
+        self.api._update_state(dict(items=[dict(id=1, content="updated", labels=[3]),
+                                           dict(id=2, is_deleted=1)]))
+        self.assertEqual(self.api.items.get_by_id(1)["content"], "updated")
+        self.assertEqual([o["id"] for o in self.api.select(labels=3)], [1])
+        self.assertIsNone(self.api.items.get_by_id(2, only_local=True))
+
+        snap = self.api.snapshot()
+        self.assertEqual(snap.get_by_id("items", 1)["content"], "updated")
+        s = json.dumps(self.api.items.get_by_id(0), default=aiotodoist.json_default)
+        self.assertEqual(json.loads(s)["Item"]["content"], "task 0")
+
+    def test_local_edits(self):
+        item = self.api.items.get_by_id(1)
+        item.move(project_id=4)
+        item.data.update(labels=[5], content="moved")
+        self.assertEqual(self.api.select(project_id=4, labels=5), [item])
+        self.assertEqual(sorted(o["id"] for o in self.api.select(project_id=1)), [0, 2])
+
+    def test_pickle(self):
+        item = self.api.items.get_by_id(1)
+        item.temp_id = "tmp"
+        copied = pickle.loads(pickle.dumps(item))
+        self.assertIs(type(copied), type(item))
+        self.assertEqual((dict(copied.data), copied.temp_id), (dict(item.data), "tmp"))
+        self.assertIsNone(copied.api)
+
+        items = pickle.loads(pickle.dumps(self.api.serialize()["state"]["items"]))
+        api = aiotodoist.AsyncTodoistAPI("DUMMY_TOKEN", session=MagicMock(),
+                                         cache=None, compact=True)
+        api.state["items"] = items
+        restored = api.items.get_by_id(2, only_local=True)
+        self.assertEqual(restored["content"], "task 2")
+        self.assertIs(restored.api, api)
+        self.assertIs(api.model_classes, self.api.model_classes)
@@ -0,0 +1,76 @@
+import asyncio
+from unittest import TestCase
+from concurrent.futures import ThreadPoolExecutor
+
+from aiotodoist.dispatch import Dispatcher, TicksDropped
+from aiotodoist.subscribe import ModelView
+
+
+def _tick(*ids, others=None, seq=0):
+    views = [ModelView("items", dict(id=i, seq=seq), None) for i in ids]
+    return dict(items=views), {}, {}, others or {}
+
+
+class TestDispatcher(TestCase):
+
+    def test_order_per_object(self):
+        seen = []
+
+        async def handler(news, updates, deletes, others):
+            for view in news.get("items", ()):
+                await asyncio.sleep(0.01 if view["id"] % 2 else 0)
+                seen.append((view["id"], view["seq"]))
+
+        async def main():
+            dispatcher = Dispatcher(handler, print, workers=3, max_lag=2)
+            for n in range(4):
+                await dispatcher.put(_tick(*range(5), seq=n))
+            self.assertLessEqual(dispatcher.lag, 2)
+            await dispatcher.join()
+            dispatcher.close()
+
+        asyncio.run(main())
+        self.assertEqual(len(seen), 20)
+        for i in range(5):
+            self.assertEqual([seq for obj_id, seq in seen if obj_id == i], [0, 1, 2, 3])
+
+    def test_executor(self):
+        seen, errors = [], []
+
+        def handler(news, updates, deletes, others):
+            if "sync_token" in others:
+                seen.append(others["sync_token"])
+            if any(view["id"] == 2 for view in news.get("items", ())):
+                raise ValueError
+
+        async def main():
+            with ThreadPoolExecutor(2) as executor:
+                dispatcher = Dispatcher(handler, errors.append, workers=2, executor=executor)
+                await dispatcher.put(_tick(1, 2, others=dict(sync_token="1")))
+                await dispatcher.put(_tick(others=dict(sync_token="2")))
+                await dispatcher.join()
+                dispatcher.close()
+
+        asyncio.run(main())
+        self.assertEqual(seen, ["1", "2"])
+        self.assertEqual([type(e) for e in errors], [ValueError])
+
+    def test_close(self):
+        seen, errors = [], []
+
+        async def handler(news, updates, deletes, others):
+            await asyncio.sleep(0.01)
+            seen.append(others)
+
+        async def main():
+            dispatcher = Dispatcher(handler, errors.append, workers=1)
+            for n in range(3):
+                await dispatcher.put(_tick(others=dict(n=n)))
+            await asyncio.sleep(0)
+            dispatcher.close()  # while the first tick is handled.
+            self.assertEqual(dispatcher.lag, 0)
+
+        asyncio.run(main())
+        self.assertEqual(seen, [])
+        self.assertEqual([type(e) for e in errors], [TicksDropped])
+        self.assertEqual([tick[3] for tick in errors[0].ticks], [dict(n=1), dict(n=2)])
@@ -0,0 +1,87 @@
+import asyncio
+from unittest import TestCase
+from unittest.mock import MagicMock
+
+import aiotodoist
+from aiotodoist.events import ChangeStreamOverflow, CREATED, UPDATED, DELETED, field_changes
+
+
+class TestChangeStream(TestCase):
+
+    def setUp(self):
+        self.api = aiotodoist.AsyncTodoistAPI("DUMMY_TOKEN", session=MagicMock(), cache=None)
+        self.api._update_state(dict(items=[dict(id=1, content="a"), dict(id=2, content="b")]))
+
+    def test_changes(self):
+        async def main():
+            stream = self.api.changes()
+            seen = []
+
+            async def consume():
+                async for event in stream:
+                    seen.append(event)
+
+            task = asyncio.ensure_future(consume())
+            self.api._update_state(dict(items=[dict(id=1, content="c"), dict(id=2, is_deleted=1),
+                                               dict(id=3, content="d")]))
+            await asyncio.sleep(0)
+            self.assertEqual(len(seen), 3)  # without waiting for the next sync.
+
+            self.api._update_state(dict(user=dict(id=9)))
+            await self.api.close()
+            await task
+            return seen
+
+        seen = asyncio.run(main())
+        self.assertEqual([(e.kind, e.dtype, e.id) for e in seen],
+                         [(UPDATED, "items", 1), (DELETED, "items", 2), (CREATED, "items", 3)])
+        updated, deleted, created = seen
+        self.assertEqual(updated.before, dict(id=1, content="a"))
+        self.assertEqual(updated.changes, dict(content=("a", "c")))
+        self.assertIsNone(created.changes)
+        self.assertEqual(updated.after, dict(id=1, content="c"))
+        self.assertEqual(deleted.before, dict(id=2, content="b"))
+        self.assertIsNone(deleted.after)
+        self.assertIsNone(created.before)
+        self.assertEqual(self.api.change_streams, [])
+
+    def test_lagging_consumer(self):
+        async def main():
+            stream = self.api.changes()
+            self.api._update_state(dict(items=[dict(id=1, content="b"), dict(id=3, content="x")]))
+            self.api._update_state(dict(items=[dict(id=1, content="c"), dict(id=3, content="y")]))
+            stream.close()
+            return [(e.id, e.before and e.before["content"], e.after["content"])
+                    async for e in stream]
+
+        self.assertEqual(asyncio.run(main()),
+                         [(1, "a", "b"), (3, None, "x"), (1, "b", "c"), (3, "x", "y")])
+
+    def test_field_changes(self):
+        local = dict(id=1, checked=0, due=None, labels=[1])
+        remote = dict(id=1, checked=1, due=dict(date="2020-01-02"), labels=[1], priority=4)
+        self.assertEqual(field_changes(local, remote),
+                         dict(checked=(0, 1), due=(None, dict(date="2020-01-02")),
+                              priority=(None, 4)))
+        self.assertEqual(field_changes(local, dict(local)), {})
+
+    def test_overflow(self):
+        async def main():
+            dropping = self.api.changes(maxsize=2)
+            raising = self.api.changes(maxsize=2, overflow="raise")
+            self.api._update_state(dict(items=[dict(id=i) for i in range(3, 6)]))
+            self.assertEqual([dropping.api, raising.closed], [self.api, True])
+            self.assertEqual(self.api.change_streams, [dropping])
+
+            dropping.close()
+            ids = [event.id async for event in dropping]
+            seen = []
+            with self.assertRaises(ChangeStreamOverflow):
+                async for event in raising:
+                    seen.append(event.id)
+            return dropping, ids, seen
+
+        dropping, ids, seen = asyncio.run(main())
+        self.assertEqual(dropping.dropped, 1)
+        self.assertEqual(ids, [4, 5])
+        self.assertEqual(seen, [3, 4])
@@ -0,0 +1,114 @@
+from asyncio import gather, sleep, all_tasks, ensure_future
+from unittest.mock import patch
+
+from aiohttp.test_utils import AioHTTPTestCase, unittest_run_loop
+
+import aiotodoist
+from aiotodoist.responses import ResponseCache
+from tests.stubs import create_app
+
+
+class TestAsyncManagers(AioHTTPTestCase):
+
+    async def get_application(self):
+        return create_app()
+
+    async def setUpAsync(self):
+        await super().setUpAsync()
+        self.api = aiotodoist.AsyncTodoistAPI("DUMMY_TOKEN",
+                                              session=self.client,
+                                              cache=None)
+        self.api.get_api_url = lambda: "/"
+        self.api.api_endpoint = ""
+        self.hits = self.app["hits"]
+
+    @unittest_run_loop
+    async def test_get(self):
+        resp = await self.api.items.get(1)
+        self.assertEqual(resp["item"], dict(id=1, content="1"))
+        self.assertEqual(self.api.items.get_by_id(1)["content"], "1")
+
+        resp = await self.api.labels.get(0)
+        self.assertEqual(resp, {})
+
+    @unittest_run_loop
+    async def test_get_coalescing(self):
+        resps = await gather(*[self.api.items.get(1) for _ in range(5)])
+        self.assertEqual(self.hits, {"1": 1})
+        self.assertTrue(all(r is resps[0] for r in resps))
+
+        await self.api.items.get(1)
+        self.assertEqual(self.hits, {"1": 2})
+
+    @unittest_run_loop
+    async def test_get_ttl_cache(self):
+        self.api.responses = ResponseCache(ttl=60, maxsize=2)
+        for item_id in (1, 1, 2, 1, 3, 2, 0, 0):
+            await self.api.items.get(item_id)
+        self.assertEqual(self.hits, {"1": 1, "2": 2, "3": 1, "0": 2})
+
+        self.api._update_state(dict(items=[dict(id=3, content="new")]))
+        await self.api.items.get(3)
+        self.assertEqual(self.hits["3"], 2)
+
+        # a response sent before a delta of its object is not cached.
+        fut = self.api.items.get(1)
+        await sleep(0)
+        self.api._update_state(dict(items=[dict(id=1, content="new")]))
+        self.assertEqual((await fut)["item"]["content"], "1")
+        await self.api.items.get(1)
+        self.assertEqual(self.hits["1"], 3)
+
+    @unittest_run_loop
+    async def test_get_many(self):
+        with patch.object(self.api, "_update_state",
+                          wraps=self.api._update_state) as m_update:
+            resps = await self.api.items.get_many([3, 1, 0, 3], concurrency=2)
+
+        m_update.assert_called_once()
+        self.assertEqual([r.get("item", {}).get("id") for r in resps],
+                         [3, 1, None, 3])
+        self.assertIn("error", resps[2])
+        self.assertEqual(self.hits, {"3": 1, "1": 1, "0": 1})
+        self.assertEqual(len(self.api.state["items"]), 2)
+
+    @unittest_run_loop
+    async def test_get_many_shared(self):
+        self.api.responses = ResponseCache(ttl=60)
+        many = ensure_future(self.api.items.get_many([1, 2]))
+        await sleep(0)
+        single = await self.api.items.get(1)  # joins the request of get_many.
+        await many
+        self.assertEqual(single["item"]["id"], 1)
+        await self.api.items.get(2)  # cached.
+        self.assertEqual(self.hits, {"1": 1, "2": 1})
+
+    @unittest_run_loop
+    async def test_archive_items(self):
+        archive = self.api.items_archive.for_project(1)
+        items = archive.items(depth=1)
+        self.assertNotIn("archive:1", self.hits)  # requested, not sent yet.
+        ids = [item["id"] async for item in items]
+        self.assertEqual(ids, [f"1.{page}.{n}" for page in range(3) for n in range(2)])
+        self.assertEqual(self.hits["archive:1"], 3)  # no extra request.
+
+        ids = [item["id"] async for item in archive]
+        self.assertEqual(len(ids), 6)
+
+        items = archive.items()
+        async for item in items:
+            break
+        await items.aclose()
+
+        await sleep(0.01)
+        tasks, hits = len(all_tasks()), self.hits["archive:1"]
+        archive.items()  # never used.
+        await sleep(0.01)
+        self.assertEqual((len(all_tasks()), self.hits["archive:1"]), (tasks, hits))
+
+    @unittest_run_loop
+    async def test_archive_for_projects(self):
+        items = await self.api.items_archive.for_projects([1, 2, 3], concurrency=2)
+        self.assertEqual(list(items), [1, 2, 3])
+        self.assertEqual([item["id"] for item in items[2][:2]], ["2.0.0", "2.0.1"])
+        self.assertEqual([len(project_items) for project_items in items.values()], [6] * 3)
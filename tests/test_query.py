@@ -0,0 +1,54 @@
+from datetime import date
+from unittest import TestCase
+from unittest.mock import MagicMock
+
+import aiotodoist
+
+
+def _item(i, project_id, labels=(), checked=0, due=None, day_order=0):
+    return dict(id=i, project_id=project_id, labels=list(labels), checked=checked,
+                due=due and dict(date=due), day_order=day_order)
+
+
+class TestSelect(TestCase):
+
+    def setUp(self):
+        self.api = aiotodoist.AsyncTodoistAPI("DUMMY_TOKEN", session=MagicMock(), cache=None)
+        self.api._update_state(dict(items=[
+            _item(1, 10, [7], due="2020-01-01", day_order=3),
+            _item(2, 10, [7, 8], due="2020-01-03T10:00:00", day_order=1),
+            _item(3, 10, [8], due="2020-01-02", checked=1),
+            _item(4, 20, [7], due="2020-02-01", day_order=2),
+            _item(5, 10, [7]),
+            dict(id=6, project_id=10, parent_id=1, content="child"),
+        ]))
+
+    def ids(self, **kwargs):
+        return [obj["id"] for obj in self.api.select(**kwargs)]
+
+    def test_filters(self):
+        self.assertEqual(sorted(self.ids(project_id=10, labels=7)), [1, 2, 5])
+        self.assertEqual(self.ids(parent_id=1), [6])
+        self.assertEqual(self.ids(project_id=10, checked=1), [3])
+        self.assertEqual(self.ids(due="2020-01-03"), [2])
+        self.assertEqual(self.ids(project_id=10, content="child"), [6])
+        self.assertEqual(self.ids(project_id=30), [])
+
+        overdue = dict(project_id=10, labels=7, checked=0, due_before=date(2020, 1, 3))
+        self.assertEqual(self.ids(**overdue), [1])
+        self.assertEqual(sorted(self.ids(due_from="2020-01-02", due_before="2020-02-01")), [2, 3])
+
+    def test_order_and_limit(self):
+        self.assertEqual(self.ids(labels=7, order_by="day_order"), [5, 2, 4, 1])
+        self.assertEqual(self.ids(labels=7, order_by="day_order", limit=2), [5, 2])
+        self.assertEqual(self.ids(labels=7, order_by="day_order", reverse=True, limit=1), [1])
+        self.assertEqual(self.ids(project_id=10, order_by="due"), [1, 3, 2, 5, 6])
+        self.assertEqual(self.ids(labels=7, order_by="due", limit=2), [1, 2])
+        self.assertEqual(self.ids(project_id=10, order_by="labels", limit=3), [1, 5, 2])
+
+    def test_incremental(self):
+        self.api._update_state(dict(items=[dict(id=1, labels=[8], due=dict(date="2020-03-01")),
+                                           dict(id=2, is_deleted=1)]))
+        self.assertEqual(sorted(self.ids(labels=8)), [1, 3])
+        self.assertEqual(self.ids(due_from="2020-01-03", due_before="2020-02-02"), [4])
+        self.assertEqual(self.ids(due_from="2020-03-01"), [1])
@@ -0,0 +1,80 @@
+import asyncio
+from unittest import TestCase
+from unittest.mock import MagicMock
+
+import aiotodoist
+from aiotodoist.scheduler import AdaptiveInterval, SyncScheduler
+
+
+def _make_api(changing):
+    api = aiotodoist.AsyncTodoistAPI("DUMMY_TOKEN", session=MagicMock(), cache=None)
+    api.posts = []
+
+    async def _post(call, data):
+        api.posts.append(data["commands"])
+        items = [dict(id=len(api.posts))] if changing else []
+        return dict(sync_token=str(len(api.posts)), items=items)
+
+    api._post = _post
+    return api
+
+
+class TestSyncScheduler(TestCase):
+
+    def test_adaptive_interval(self):
+        interval = AdaptiveInterval(1, 5, factor=2)
+        self.assertEqual([interval.update(n) for n in (0, 0, 0, 3, 0)],
+                         [2, 4, 5, 1, 2])
+
+    def test_run(self):
+        async def main():
+            busy, idle = _make_api(True), _make_api(False)
+            scheduler = SyncScheduler(concurrency=1, min_delay=0.01,
+                                      max_delay=0.2, jitter=0)
+            scheduler.check_every = 0.01
+            seen = []
+            for api in (busy, idle):
+                scheduler.add(api, lambda *infos: seen.append(infos), print)
+            task = asyncio.ensure_future(scheduler.run())
+
+            await asyncio.sleep(0.2)
+            idle.queue.append(dict(type="item_delete", args=dict(id=1)))
+            await asyncio.sleep(0.05)
+            task.cancel()
+            scheduler.close()
+            return busy, idle, seen
+
+        busy, idle, seen = asyncio.run(main())
+        self.assertGreater(len(busy.posts), 2 * len(idle.posts))
+        self.assertIn('[{"type":"item_delete","args":{"id":1}}]', idle.posts)
+        self.assertEqual(idle.queue, [])
+        self.assertTrue(any(infos[0].get("items") for infos in seen))
+        self.assertEqual(busy.response_hooks, [])
+
+    def test_error_handler_raises(self):
+        async def main():
+            api = _make_api(False)
+            scheduler = SyncScheduler(concurrency=1, min_delay=0.01, jitter=0, relax=0.01)
+            scheduler.check_every = 0.01
+            reported = []
+            asyncio.get_running_loop().set_exception_handler(
+                lambda loop, context: reported.append(context["exception"]))
+
+            async def _post(call, data):
+                api.posts.append(data)
+                raise ValueError
+
+            def error_handler(exc):
+                raise NotImplementedError
+
+            api._post = _post
+            scheduler.add(api, print, error_handler)
+            task = asyncio.ensure_future(scheduler.run())
+            await asyncio.sleep(0.1)
+            task.cancel()
+            scheduler.close()
+            return api, reported
+
+        api, reported = asyncio.run(main())
+        self.assertGreater(len(api.posts), 1)  # polled again.
+        self.assertIsInstance(reported[0], NotImplementedError)
@@ -0,0 +1,111 @@
+from unittest import TestCase
+from unittest.mock import MagicMock
+
+from todoist.models import Note
+
+import aiotodoist
+from aiotodoist.snapshot import PMap
+
+
+class _Collide:
+
+    def __init__(self, n):
+        self.n = n
+
+    def __hash__(self):
+        return 7
+
+    def __eq__(self, other):
+        return isinstance(other, _Collide) and other.n == self.n
+
+
+class TestPMap(TestCase):
+
+    def test_persistence(self):
+        maps = [PMap()]
+        for i in range(2000):
+            maps.append(maps[-1].set(i, str(i)))
+        big = maps[-1]
+        self.assertEqual(len(big), 2000)
+        self.assertEqual(dict(big), {i: str(i) for i in range(2000)})
+        self.assertEqual(len(maps[1000]), 1000)
+        self.assertNotIn(1500, maps[1000])
+
+        smaller = big.delete(5).delete(5).delete(-1)
+        self.assertEqual((len(big), len(smaller)), (2000, 1999))
+        self.assertIn(5, big)
+        self.assertNotIn(5, smaller)
+        self.assertEqual(big.set(3, "x")[3], "x")
+        self.assertEqual(big[3], "3")
+        self.assertEqual(len(big.set(3, "x")), 2000)
+
+        empty = PMap({1: 1}).delete(1)
+        self.assertEqual((len(empty), list(empty)), (0, []))
+
+    def test_collisions(self):
+        pmap = PMap((_Collide(n), n) for n in range(3))
+        self.assertEqual(len(pmap), 3)
+        self.assertEqual(pmap[_Collide(2)], 2)
+        pmap = pmap.delete(_Collide(1)).set(_Collide(0), 10)
+        self.assertEqual(sorted(pmap.values()), [2, 10])
+
+
+class TestSnapshot(TestCase):
+
+    def setUp(self):
+        self.api = aiotodoist.AsyncTodoistAPI("DUMMY_TOKEN", session=MagicMock(), cache=None)
+        self.api._update_state(dict(sync_token="1", user=dict(id=9),
+                                    items=[dict(id=i, labels=[1]) for i in range(100)],
+                                    projects=[dict(id=1)]))
+
+    def test_snapshot(self):
+        first = self.api.snapshot()
+        self.api._update_state(dict(sync_token="2", user=dict(id=10),
+                                    items=[dict(id=1, labels=[2]), dict(id=2, is_deleted=1),
+                                           dict(id=100)]))
+        second = self.api.snapshot()
+
+        self.assertEqual((first.sync_token, second.sync_token), ("1", "2"))
+        self.assertEqual(first["user"]["id"], 9)
+        self.assertEqual(first.get_by_id("items", 1)["labels"], (1, ))
+        self.assertEqual(second.get_by_id("items", 1)["labels"], (2, ))
+        self.assertEqual((len(first["items"]), len(second["items"])), (100, 100))
+        self.assertIsNone(second.get_by_id("items", 2))
+        self.assertIs(first.get_by_id("items", 50), second.get_by_id("items", 50))
+        self.assertIs(first["projects"], second["projects"])
+
+        with self.assertRaises(TypeError):
+            first.get_by_id("items", 1)["content"] = "x"
+
+    def test_temp_ids(self):
+        self.api.state["user"]["inbox_project"] = 1
+        obj = self.api.items.add("new", project_id=1)
+        self.api.state["notes"].append(Note(dict(id="n", item_id=obj.temp_id), self.api))
+        first = self.api.snapshot()
+        self.assertEqual(first.get_by_id("items", obj.temp_id)["content"], "new")
+
+        later = self.api.items.add("later", project_id=1)
+        self.api._apply_temp_ids(dict(temp_id_mapping={obj.temp_id: 200}))
+        self.api._update_state(dict(items=[dict(id=200, content="new", project_id=1)]))
+        second = self.api.snapshot()
+        self.assertNotIn(obj.temp_id, second["items"])
+        self.assertEqual(second.get_by_id("items", 200)["content"], "new")
+        self.assertEqual(second.get_by_id("items", later.temp_id)["content"], "later")
+        self.assertEqual(len(second["items"]), len(self.api.state["items"]))
+        self.assertEqual(second.get_by_id("notes", "n")["item_id"], 200)
+        self.assertEqual(first.get_by_id("notes", "n")["item_id"], obj.temp_id)
+
+    def test_state_values(self):
+        first = self.api.snapshot()
+        self.assertIs(self.api.snapshot()["user"], first["user"])  # not copied again.
+        self.api._update_state(dict(user=dict(id=10)))
+        self.assertEqual(self.api.snapshot()["user"]["id"], 10)
+        self.assertEqual(first["user"]["id"], 9)
+
+        third = self.api.snapshot()
+        self.api._update_state(dict(sync_token="next", items=[dict(id=1, content="x")],
+                                    day_orders=dict(a=1)))
+        fourth = self.api.snapshot()
+        self.assertIs(fourth["user"], third["user"])
+        self.assertIsNot(fourth["day_orders"], third["day_orders"])
+        self.assertEqual(fourth["day_orders"]["a"], 1)
@@ -0,0 +1,115 @@
+from unittest import TestCase
+from unittest.mock import MagicMock
+
+import aiotodoist
+from aiotodoist.state import StateList
+
+
+class TestStateIndex(TestCase):
+
+    def setUp(self):
+        self.api = aiotodoist.AsyncTodoistAPI("DUMMY_TOKEN",
+                                              session=MagicMock(),
+                                              cache=None)
+
+    def test_state_lists(self):
+        for dtype in ("items", "projects", "collaborator_states"):
+            self.assertIsInstance(self.api.state[dtype], StateList)
+        self.assertIsInstance(self.api.state["day_orders"], dict)
+
+    def test_update_state(self):
+        self.api._update_state(dict(
+            sync_token="abc",
+            items=[dict(id=1, project_id=10, content="a"),
+                   dict(id=2, project_id=10, parent_id=1, content="b")],
+            collaborator_states=[dict(project_id=10, user_id=5, state="active")],
+        ))
+        index = self.api.state["items"].index
+        self.assertEqual(self.api.sync_token, "abc")
+        self.assertEqual(index.get(2)["content"], "b")
+        self.assertEqual({o["id"] for o in index.lookup("project_id", 10)}, {1, 2})
+        self.assertEqual([o["id"] for o in index.lookup("parent_id", 1)], [2])
+        self.assertIsNotNone(self.api._find_object(
+            "collaborator_states", dict(project_id=10, user_id=5)))
+
+        self.api._update_state(dict(items=[dict(id=2, project_id=20, parent_id=None),
+                                           dict(id=1, is_deleted=1)]))
+        self.assertEqual([o["id"] for o in self.api.state["items"]], [2])
+        self.assertIsNone(index.get(1))
+        self.assertEqual([o["id"] for o in index.lookup("project_id", 20)], [2])
+        self.assertEqual(index.lookup("project_id", 10), [])
+        self.assertEqual(index.lookup("parent_id", 1), [])
+
+    def test_local_objects_and_temp_id(self):
+        self.api.state["user"]["inbox_project"] = 10
+        item = self.api.items.add("local")
+        self.assertIs(self.api.items.get_by_id(item.temp_id), item)
+
+        self.assertTrue(self.api._replace_temp_id(item.temp_id, 42))
+        self.assertIs(self.api.items.get_by_id(42, only_local=True), item)
+        self.assertIs(self.api._find_object("items", dict(id=42)), item)
+        self.assertFalse(self.api._replace_temp_id("unknown", 43))
+
+    def test_local_edits(self):
+        self.api._update_state(dict(items=[dict(id=1, project_id=10, checked=0)]))
+        item = self.api.items.get_by_id(1)
+        item.complete()
+        item.move(project_id=20)
+        self.assertEqual(self.api.select(checked=0), [])
+        self.assertEqual(self.api.select(checked=1, project_id=20), [item])
+        self.assertEqual(self.api.select(project_id=10), [])
+
+        self.api.state["items"].remove(item)
+        item.update(project_id=30)
+        self.assertEqual(self.api.select(project_id=30), [])
+
+    def test_list_mutations(self):
+        objs = self.api.state["labels"]
+        self.api._update_state(dict(labels=[dict(id=i) for i in range(5)]))
+        objs.pop(0)
+        del objs[0:2]
+        objs.remove(objs[-1])
+        self.assertEqual([o["id"] for o in objs], [3])
+        self.assertEqual(len(objs.index), 1)
+
+        objs.clear()
+        self.assertIsNone(objs.index.get(3))
+
+    def test_replace_temp_ids(self):
+        self.api.state["user"]["inbox_project"] = 10
+        project = self.api.projects.add("p")
+        section = self.api.sections.add("s", project_id=project.temp_id)
+        parent = self.api.items.add("parent", project_id=project.temp_id,
+                                    section_id=section.temp_id)
+        child = self.api.items.add("child", project_id=project.temp_id,
+                                   parent_id=parent.temp_id)
+        note = self.api.notes.add(child.temp_id, "note")
+        mapping = {obj.temp_id: n for n, obj in enumerate(
+            (project, section, parent, child, note), start=100)}
+
+        self.api._merge_response(dict(temp_id_mapping=mapping))
+        self.assertEqual([project["id"], section["id"], parent["id"], child["id"], note["id"]],
+                         [100, 101, 102, 103, 104])
+        self.assertEqual(section["project_id"], 100)
+        self.assertEqual((parent["project_id"], parent["section_id"]), (100, 101))
+        self.assertEqual((child["project_id"], child["parent_id"]), (100, 102))
+        self.assertEqual(note["item_id"], 103)
+        self.assertEqual(self.api.temp_ids, mapping)
+
+        items = self.api.state["items"].index
+        self.assertEqual([o["id"] for o in items.lookup("parent_id", 102)], [103])
+        self.assertEqual(items.lookup("parent_id", parent.temp_id), [])
+        self.assertIs(self.api.notes.get_by_id(104, only_local=True), note)
+
+    def test_replace_temp_ids_of_local_edits(self):
+        self.api.state["user"]["inbox_project"] = 10
+        self.api._update_state(dict(items=[dict(id=1, project_id=10, parent_id=None)]))
+        item = self.api.items.get_by_id(1)
+        project = self.api.projects.add("p")
+        parent = self.api.items.add("parent")
+        item.move(project_id=project.temp_id)
+        item.move(parent_id=parent.temp_id)
+
+        self.api._replace_temp_ids({project.temp_id: 99, parent.temp_id: 100})
+        self.assertEqual((item["project_id"], item["parent_id"]), (99, 100))
+        self.assertEqual(self.api.select(parent_id=100), [item])
@@ -0,0 +1,144 @@
+import json
+import pickle
+import asyncio
+from unittest import TestCase
+from unittest.mock import MagicMock, patch
+
+from todoist.models import Item
+
+import aiotodoist
+from aiotodoist.subscribe import ModelView, _dtypes, _process_data, subscribe
+
+
+class TestProcessData(TestCase):
+
+    def setUp(self):
+        self.api = aiotodoist.AsyncTodoistAPI("DUMMY_TOKEN", session=MagicMock(), cache=None)
+        self.api._update_state(dict(items=[dict(id=1, content="a"), dict(id=2, content="b")]))
+
+    def test_process_data(self):
+        user = dict(id=9)
+        data = dict(items=[dict(id=1, content="c"), dict(id=2, is_deleted=1),
+                           dict(id=3, content="d"), dict(id=4, is_deleted=1)],
+                    user=user, sync_token="1")
+        news, updates, deletes, others = _process_data(self.api, data)
+
+        self.assertEqual([v["id"] for v in news["items"]], [3])
+        self.assertEqual([v["id"] for v in updates["items"]], [1])
+        self.assertEqual([v["id"] for v in deletes["items"]], [2])
+        self.assertIs(updates["items"][0].data, data["items"][0])
+        self.assertEqual(updates["items"][0].changes, dict(content=("a", "c")))
+        self.assertIsNone(news["items"][0].changes)
+        self.assertIs(others["user"], user)
+        self.assertNotIn("items", others)
+
+        view = news["items"][0]
+        self.assertIsNone(view._model)
+        self.assertEqual(view.get("content"), "d")
+        self.assertIsInstance(view.model, Item)
+        self.assertIs(view.model.data, view.data)
+        self.assertIsNot(view.data, data["items"][2])  # it becomes the model data.
+        self.assertIs(view.api, self.api)
+        self.assertEqual(view.temp_id, "")  # an attribute of the model.
+
+    def test_json_default(self):
+        view = ModelView("items", dict(id=3), self.api)
+        s = json.dumps([view, Item(dict(id=4), self.api)], default=aiotodoist.json_default)
+        self.assertEqual(json.loads(s), [{"Item": {"id": 3}}, {"Item": {"id": 4}}])
+
+        copied = pickle.loads(pickle.dumps(view))
+        self.assertEqual((copied.dtype, copied.data, copied.api), ("items", dict(id=3), None))
+
+    def test_resource_types(self):
+        self.assertEqual(_dtypes(["items", "notes"]), ("items", "notes", "project_notes"))
+        self.assertNotIn("projects", _dtypes(["all", "-projects"]))
+        self.assertEqual(len(_dtypes()), len(_dtypes(["all"])))
+
+        data = dict(items=[dict(id=3, project_id=1), dict(id=4, project_id=2)],
+                    projects=[dict(id=1)])
+        with patch.object(self.api, "_find_object", wraps=self.api._find_object) as m_find:
+            news, *_ = _process_data(self.api, data, _dtypes(["items"]),
+                                     lambda dtype, rdata: rdata["project_id"] == 1)
+        self.assertEqual(news, dict(items=[news["items"][0]]))
+        self.assertEqual(news["items"][0]["id"], 3)
+        self.assertEqual(m_find.call_count, 1)
+
+    def test_subscribe(self):
+        posts, seen = [], []
+
+        async def _post(call, data):
+            posts.append(data["resource_types"])
+            if len(posts) > 1:
+                raise asyncio.CancelledError
+            return dict(sync_token="1", items=[dict(id=3, project_id=1)], projects=[dict(id=1)])
+
+        self.api._post = _post
+        with self.assertRaises(asyncio.CancelledError):
+            asyncio.run(subscribe(self.api, lambda *infos: seen.append(infos), print,
+                                  delay=0, resource_types=["items"]))
+        self.assertEqual(posts, ['["items"]'] * 2)
+        self.assertEqual(list(seen[0][0]), ["items"])
+        self.assertEqual(self.api.response_hooks, [])
+
+    def test_subscribe_workers_drain(self):
+        posts, seen = [], []
+
+        async def _post(call, data):
+            posts.append(data)
+            if len(posts) > 1:
+                raise asyncio.CancelledError
+            return dict(sync_token="1", items=[dict(id=i) for i in range(3, 7)])
+
+        async def handler(news, updates, deletes, others):
+            await asyncio.sleep(0.01)
+            seen.extend(view["id"] for view in news.get("items", ()))
+
+        self.api._post = _post
+        with self.assertRaises(asyncio.CancelledError):
+            asyncio.run(subscribe(self.api, handler, print, delay=0, workers=2))
+        self.assertEqual(sorted(seen), [3, 4, 5, 6])
+
+    def test_subscribe_predicate_error(self):
+        posts, errors = [], []
+
+        async def _post(call, data):
+            posts.append(data)
+            if len(posts) > 1:
+                raise asyncio.CancelledError
+            return dict(sync_token="1", items=[dict(id=3)])
+
+        def predicate(dtype, rdata):
+            raise ValueError(rdata["id"])
+
+        self.api._post = _post
+        with self.assertRaises(asyncio.CancelledError):
+            asyncio.run(subscribe(self.api, print, errors.append, delay=0,
+                                  predicate=predicate))
+        self.assertEqual([e.args for e in errors], [(3, )])
+        self.assertEqual(self.api.sync_token, "1")  # merged all the same.
+        self.assertEqual(self.api.items.get_by_id(3, only_local=True)["id"], 3)
+
+    def test_subscribe_wakes_on_commit(self):
+        posts, seen = [], []
+
+        async def _post(call, data):
+            posts.append(data["commands"])
+            return dict(sync_token=str(len(posts)), sync_status={},
+                        items=[dict(id=len(posts))] if data["commands"] != "[]" else [])
+
+        async def main():
+            self.api._post = _post
+            task = asyncio.ensure_future(subscribe(self.api, lambda *infos: seen.append(infos),
+                                                   print, delay=0.05, max_delay=10))
+            await asyncio.sleep(0.25)  # idle: 0.1, then 0.2 seconds apart.
+            syncs = len(posts)
+            self.api.queue.append(dict(type="item_delete", uuid="1", args=dict(id=1)))
+            await self.api.commit()
+            await asyncio.sleep(0.01)
+            task.cancel()
+            return syncs
+
+        syncs = asyncio.run(main())
+        self.assertEqual(syncs, 2)
+        self.assertEqual(len(posts), 3)  # the commit, without another sync.
+        self.assertEqual(seen[-1][0]["items"][0]["id"], 3)
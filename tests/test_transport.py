@@ -0,0 +1,121 @@
+from time import monotonic
+from unittest.mock import patch
+
+from aiohttp import ClientConnectionError
+from aiohttp.test_utils import AioHTTPTestCase, unittest_run_loop
+
+import aiotodoist
+from aiotodoist.transport import Transport, TokenBucket, ConnectionPool
+from tests.stubs import create_app
+
+try:
+    from unittest.mock import AsyncMock  # type: ignore[attr-defined]
+except ImportError:
+    from asynctest import CoroutineMock as AsyncMock
+
+
+class TestTransport(AioHTTPTestCase):
+
+    async def get_application(self):
+        return create_app()
+
+    async def setUpAsync(self):
+        await super().setUpAsync()
+        self.api = aiotodoist.AsyncTodoistAPI("DUMMY_TOKEN",
+                                              session=self.client,
+                                              cache=None)
+        self.api.get_api_url = lambda: "/"
+        self.hits = self.app["hits"]
+
+    @unittest_run_loop
+    async def test_retry_after(self):
+        self.api.transport = Transport(retries=3, rate=100)
+        with patch("aiotodoist.transport.uniform") as m_uniform:
+            resp = await self.api._get_async("throttled")
+        self.assertEqual(resp, {})
+        self.assertEqual(self.hits["/throttled"], 3)
+        m_uniform.assert_not_called()
+
+    @unittest_run_loop
+    async def test_backoff(self):
+        self.api.transport = Transport(retries=2, backoff=0.001)
+        resp = await self.api._post_async("unavailable")
+        self.assertEqual(resp, dict(error=503))  # gives up with the last response.
+        self.assertEqual(self.hits["/unavailable"], 3)
+
+    @unittest_run_loop
+    async def test_connection_error(self):
+        self.api.transport = Transport(retries=1, backoff=0.001, concurrency=2)
+        ok = await self.client.get("get_null")
+        with patch.object(self.client, "get", new=AsyncMock()) as m_get:
+            m_get.side_effect = [ClientConnectionError(), ok]
+            resp = await self.api._get_async("get_null")
+        self.assertEqual(resp, {})
+        self.assertEqual(m_get.call_count, 2)
+
+        with patch.object(self.client, "get", new=AsyncMock()) as m_get, \
+                self.assertRaises(ClientConnectionError):
+            m_get.side_effect = ClientConnectionError()
+            await self.api._get_async("get_null")
+        self.assertEqual(m_get.call_count, 2)
+
+    @unittest_run_loop
+    async def test_connection_error_backoff(self):
+        self.api.transport = Transport(retries=3, backoff=0.5)
+        with patch.object(self.client, "get", new=AsyncMock()) as m_get, \
+                patch("aiotodoist.transport.uniform", side_effect=lambda a, b: b), \
+                patch("aiotodoist.transport.sleep", new=AsyncMock()) as m_sleep, \
+                self.assertRaises(ClientConnectionError):
+            m_get.side_effect = ClientConnectionError()
+            await self.api._get_async("get_null")
+        self.assertEqual([c.args[0] for c in m_sleep.call_args_list], [0.5, 1.0, 2.0])
+
+    @unittest_run_loop
+    async def test_concurrency_holds_body(self):
+        transport = Transport(concurrency=1)
+        async with transport.stream(self.client, "get", "get_null") as resp:
+            self.assertTrue(transport._sem.locked())  # until the body was read.
+            await resp.read()
+        self.assertFalse(transport._sem.locked())
+
+        resp = await transport.request(self.client, "get", "get_null")
+        self.assertFalse(transport._sem.locked())
+        self.assertEqual(await resp.json(), {})
+
+    @unittest_run_loop
+    async def test_token_bucket(self):
+        bucket = TokenBucket(rate=100, burst=2)
+        start = monotonic()
+        for _ in range(4):
+            await bucket.acquire()
+        self.assertGreaterEqual(monotonic() - start, 0.015)
+
+        bucket.pause(0.05)
+        start = monotonic()
+        await bucket.acquire()
+        self.assertGreaterEqual(monotonic() - start, 0.04)
+
+    @unittest_run_loop
+    async def test_pool(self):
+        async with ConnectionPool(limit=5, timeout=10) as pool:
+            apis = [aiotodoist.AsyncTodoistAPI("DUMMY_TOKEN", pool=pool, cache=None)
+                    for _ in range(2)]
+            self.assertIs(apis[0].session.connector, apis[1].session.connector)
+            self.assertEqual(apis[0].session.connector.limit, 5)
+
+            async with apis[0] as api:
+                self.assertIs(api, apis[0])
+            self.assertTrue(apis[0].session.closed)
+            self.assertFalse(pool.connector.closed)
+            await apis[1].close()
+        self.assertTrue(pool._connector.closed)
+
+        async with aiotodoist.AsyncTodoistAPI("DUMMY_TOKEN", cache=None) as api:
+            connector = api.session.connector
+        self.assertTrue(api.session.closed)
+        self.assertTrue(connector.closed)
+
+        async with aiotodoist.AsyncTodoistAPI("DUMMY_TOKEN", session=self.client,
+                                              cache=None):
+            pass
+        self.assertFalse(self.client.session.closed)
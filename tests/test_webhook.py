@@ -0,0 +1,101 @@
+import hmac
+import json
+import base64
+import asyncio
+from hashlib import sha256
+
+from aiohttp import web
+from aiohttp.test_utils import AioHTTPTestCase, unittest_run_loop
+
+import aiotodoist
+from aiotodoist.subscribe import subscribe
+from aiotodoist.webhook import WebhookReceiver, event_delta
+
+
+def _signed(event, secret=b"SECRET"):
+    body = json.dumps(event).encode()
+    signature = base64.b64encode(hmac.new(secret, body, sha256).digest()).decode()
+    return dict(data=body, headers={"X-Todoist-Hmac-SHA256": signature})
+
+
+class TestWebhookReceiver(AioHTTPTestCase):
+
+    async def get_application(self):
+        self.api = aiotodoist.AsyncTodoistAPI("DUMMY_TOKEN", session=object(), cache=None)
+        self.api._update_state(dict(user=dict(id=9), items=[dict(id=1, content="a")]))
+        app = web.Application()
+        WebhookReceiver(self.api, "SECRET").add_routes(app)
+        return app
+
+    def test_event_delta(self):
+        self.assertEqual(event_delta(dict(event_name="item:deleted", event_data=dict(id=1))),
+                         dict(items=[dict(id=1, is_deleted=1)]))
+        self.assertEqual(event_delta(dict(event_name="note:added", event_data=dict(id=2, project_id=3))),
+                         dict(project_notes=[dict(id=2, project_id=3)]))
+        self.assertIsNone(event_delta(dict(event_name="reminder:fired", event_data=dict(id=4))))
+
+    @unittest_run_loop
+    async def test_signature(self):
+        event = dict(event_name="item:added", user_id=9, event_data=dict(id=2))
+        resp = await self.client.post("/webhook", **_signed(event, b"OTHER"))
+        self.assertEqual(resp.status, 403)
+        resp = await self.client.post("/webhook", data=json.dumps(event))
+        self.assertEqual(resp.status, 403)
+        self.assertIsNone(self.api.items.get_by_id(2, only_local=True))
+
+        other = dict(event, user_id=10)
+        resp = await self.client.post("/webhook", **_signed(other))
+        self.assertEqual(resp.status, 200)
+        self.assertIsNone(self.api.items.get_by_id(2, only_local=True))
+
+    @unittest_run_loop
+    async def test_unknown_user(self):
+        self.api.state["user"].clear()  # not synced yet.
+        event = dict(event_name="item:added", user_id=10, event_data=dict(id=2))
+        resp = await self.client.post("/webhook", **_signed(event))
+        self.assertEqual(resp.status, 503)
+        self.assertIsNone(self.api.items.get_by_id(2, only_local=True))
+
+    @unittest_run_loop
+    async def test_reconcile_under_events(self):
+        posts = []
+
+        async def _post(call, data):
+            posts.append(data)
+            return dict(sync_token=str(len(posts)))
+
+        self.api._post = _post
+        task = asyncio.ensure_future(subscribe(self.api, print, print, delay=0.1))
+        for n in range(20):
+            event = dict(event_name="item:updated", user_id=9, event_data=dict(id=1, content=n))
+            await self.client.post("/webhook", **_signed(event))
+            await asyncio.sleep(0.025)
+        task.cancel()
+        self.assertGreaterEqual(len(posts), 4)  # about every 0.1 seconds.
+
+    @unittest_run_loop
+    async def test_subscribe(self):
+        seen, posts = [], []
+
+        async def _post(call, data):
+            posts.append(data)
+            return dict(sync_token="1")
+
+        self.api._post = _post
+        task = asyncio.ensure_future(subscribe(self.api, lambda *infos: seen.append(infos),
+                                               print, delay=60))
+        await asyncio.sleep(0)
+        for event in (dict(event_name="item:added", user_id=9, event_data=dict(id=2, content="b")),
+                      dict(event_name="item:updated", user_id=9, event_data=dict(id=1, content="c")),
+                      dict(event_name="item:deleted", user_id=9, event_data=dict(id=2))):
+            resp = await self.client.post("/webhook", **_signed(event))
+            self.assertEqual(resp.status, 200)
+        await asyncio.sleep(0.01)
+        task.cancel()
+
+        self.assertEqual(len(posts), 1)  # the first sync, then no polling.
+        self.assertEqual(seen[1][0]["items"][0]["content"], "b")
+        self.assertEqual(self.api.items.get_by_id(1)["content"], "c")
+        self.assertIsNone(self.api.items.get_by_id(2, only_local=True))
+        kinds = [[bool(kind) for kind in infos[:3]] for infos in seen[1:]]
+        self.assertEqual(kinds, [[True, False, False], [False, True, False], [False, False, True]])